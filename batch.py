@@ -0,0 +1,219 @@
+# batch.py
+"""
+Headless batch mode for cron jobs: no prompts, JSON lines on stdout,
+progress and warnings on stderr.
+
+    python batch.py score  [--input menus.txt | -]           # one menu per line, or JSON lines
+    python batch.py score  --dates 2026-11-02 2026-11-08 --meals Lunch Dinner
+    python batch.py ingest --ratings ratings.jsonl            # or .csv: menu,llm_score,user_score
+
+Input JSON lines may carry "menu" (processed text) or "menu_dict"
+({station: [dishes]}); "llm_score" is used as-is when present.
+"""
+import argparse
+import csv
+import json
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import date
+from typing import Iterator, Optional
+
+from menu_text import menu_dish_tokens, process_menu_dict
+
+WORKERS = 4
+
+
+# -----------------------------
+# Input parsing
+# -----------------------------
+def _parse_line(line: str) -> Optional[dict]:
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        item = json.loads(line)
+    else:
+        item = {"menu": line}
+    if "menu" not in item and "menu_dict" in item:
+        item["menu"] = process_menu_dict(item["menu_dict"])
+        item["tokens"] = menu_dish_tokens(item["menu_dict"])
+    if "menu" not in item:
+        raise ValueError(f"no menu in input line: {line[:80]}")
+    return item
+
+
+def read_menus(stream) -> Iterator[dict]:
+    for line in stream:
+        item = _parse_line(line)
+        if item is not None:
+            yield item
+
+
+def read_ratings(path: str) -> Iterator[dict]:
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield {"menu": row.get("menu"), "llm_score": row.get("llm_score") or None,
+                       "user_score": row.get("user_score")}
+        return
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        yield from read_menus(f)
+
+
+def dated_menus(start: date, end: date, meals, backend_name: str) -> Iterator[dict]:
+    """
+    Menus for every (date, meal) in [start, end], fetched as one range
+    (a single page load with the Selenium backend) and cached.
+    """
+    from menu_backends import get_backend
+    from menu_cache import MenuCache
+
+    meals = list(meals)
+    backend = get_backend(backend_name, cache=MenuCache())
+    try:
+        menus = backend.fetch_range(start, end, meals)
+    finally:
+        backend.close()
+    for (d, meal), raw in sorted(menus.items(), key=lambda kv: (kv[0][0], meals.index(kv[0][1]))):
+        if not raw or not any(raw.values()):
+            print(f"[Batch] No menu for {meal} on {d.isoformat()}, skipping.")
+            continue
+        dishes = [dish for station_dishes in raw.values() for dish in station_dishes]
+        yield {"menu": process_menu_dict(raw), "dishes": dishes, "tokens": menu_dish_tokens(raw),
+               "date": d.isoformat(), "meal": meal}
+
+
+# -----------------------------
+# Commands
+# -----------------------------
+def score(items: Iterator[dict], profile: dict, workers: int, out) -> int:
+    """Score items on a worker pool, streaming results in input order."""
+    from llm import LLMScore, llama_score, llama_score_dishes, model_fallback
+    from main import LLM_DISH_MODE, LLM_STRUCTURED, load_or_build_learner
+
+    learner = load_or_build_learner()
+    fallback = model_fallback(learner)
+
+    def _llm(item):
+        if item.get("llm_score") is not None:
+            return LLMScore(int(item["llm_score"]), None, source=item.get("llm_source", "llm"))
+        if item.get("dishes") and LLM_DISH_MODE:
+            return llama_score_dishes(item["dishes"], profile, menu_text=item["menu"], tie_break=True,
+                                      fallback=fallback)
+        return llama_score(item["menu"], profile, structured=LLM_STRUCTURED, fallback=fallback)
+
+    count = 0
+    in_flight = deque()
+
+    def _emit(item, fut):
+        res = fut.result()
+        s_llm, why = res
+        result = {k: v for k, v in item.items() if k not in ("dishes", "menu_dict", "tokens")}
+        result.update(llm_score=s_llm, rationale=why, llm_source=res.source,
+                      prediction=round(learner.predict(item["menu"], s_llm, item.get("tokens")), 4))
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        for item in items:
+            in_flight.append((item, pool.submit(_llm, item)))
+            if len(in_flight) >= 2 * workers:  # bound memory on long inputs
+                _emit(*in_flight.popleft())
+                count += 1
+        while in_flight:
+            _emit(*in_flight.popleft())
+            count += 1
+    return count
+
+
+def ingest(ratings: Iterator[dict], profile: dict) -> int:
+    """
+    Apply rated menus as learner updates, log them, and checkpoint once.
+    Ratings without a real LLM score (llm_source other than "llm", or an
+    LLM fallback here) are logged with a NaN score and not trained on.
+    """
+    from checkpoint import save_checkpoint
+    from interaction_log import InteractionLog
+    from llm import llama_score
+    from main import LLM_STRUCTURED, LOG_PATH, MODEL_PATH, load_or_build_learner
+
+    learner = load_or_build_learner()
+    log = InteractionLog(LOG_PATH)
+    count = 0
+    try:
+        for n, item in enumerate(ratings, 1):
+            try:
+                menu = item["menu"]
+                if not isinstance(menu, str) or not menu.strip():
+                    raise ValueError("menu must be non-empty text")
+                rating = float(item["user_score"])
+                llm_given = None if item.get("llm_score") is None else int(float(item["llm_score"]))
+            except (KeyError, TypeError, ValueError, OverflowError) as e:
+                print(f"[WARN] Skipping rating {n}: bad or missing field ({e!r})")
+                continue
+            if not 1 <= rating <= 5:
+                print(f"[WARN] Skipping rating outside 1–5: {rating}")
+                continue
+            if llm_given is not None:
+                s_llm, llm_ok = llm_given, item.get("llm_source", "llm") == "llm"
+            else:
+                res = llama_score(menu, profile, structured=LLM_STRUCTURED)
+                s_llm, llm_ok = res[0], not res.fallback
+            pred = learner.predict(menu, s_llm, item.get("tokens"))
+            if llm_ok:
+                learner.update(menu, s_llm, rating, item.get("tokens"))
+            log.append(menu, s_llm if llm_ok else float("nan"), rating, prediction=pred, profile=profile)
+            count += 1
+    finally:
+        # Checkpoint whatever was trained so the model matches the log
+        learner.flush()
+        log.close()
+        if learner.fitted:
+            save_checkpoint(learner, MODEL_PATH)
+    print(f"Ingested {count} ratings. Metrics: {learner.metrics}")
+    return count
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="MenuMind batch scoring")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_score = sub.add_parser("score", help="score menus and stream JSON lines")
+    p_score.add_argument("--input", default="-", help="menu file (default: stdin)")
+    p_score.add_argument("--dates", nargs=2, metavar=("START", "END"), type=date.fromisoformat)
+    p_score.add_argument("--meals", nargs="+", default=["Lunch", "Dinner"])
+    p_score.add_argument("--backend", default=None, help="menu backend for --dates")
+    p_score.add_argument("--workers", type=int, default=WORKERS)
+
+    p_ingest = sub.add_parser("ingest", help="apply ratings as learner updates")
+    p_ingest.add_argument("--ratings", required=True, help="JSON lines or .csv file ('-' for stdin)")
+
+    for p in (p_score, p_ingest):
+        p.add_argument("--profile", default="profile.json")
+
+    args = parser.parse_args(argv)
+    with open(args.profile, "r", encoding="utf-8") as f:
+        profile = json.load(f)
+
+    out = sys.stdout
+    # Library code prints progress; keep stdout clean for JSON lines
+    with redirect_stdout(sys.stderr):
+        if args.command == "score":
+            if args.dates:
+                from main import MENU_BACKEND
+                items = dated_menus(args.dates[0], args.dates[1], args.meals, args.backend or MENU_BACKEND)
+                n = score(items, profile, args.workers, out)
+            elif args.input == "-":
+                n = score(read_menus(sys.stdin), profile, args.workers, out)
+            else:
+                with open(args.input, encoding="utf-8") as f:
+                    n = score(read_menus(f), profile, args.workers, out)
+            print(f"Scored {n} menus.")
+        else:
+            ingest(read_ratings(args.ratings), profile)
+
+
+if __name__ == "__main__":
+    main()
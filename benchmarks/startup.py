@@ -0,0 +1,81 @@
+# benchmarks/startup.py
+"""
+Import-time benchmark: each module is imported in a fresh interpreter
+(repeats times, median reported) so results include all transitive
+dependencies. Run from the repo root:
+
+    python benchmarks/startup.py [--repeats 5] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "main", "simulate_menu", "menu_text", "cache", "menu_cache", "interaction_log",
+    "llm", "menu_backends", "menu_scraper", "supervised_model", "checkpoint",
+    "plot", "service",
+]
+
+_PROBE = (
+    "import time, importlib; t = time.perf_counter(); "
+    "importlib.import_module({mod!r}); print(time.perf_counter() - t)"
+)
+
+
+def time_import(module: str, repeats: int = 5):
+    """Median seconds to import `module` in a fresh interpreter, or None if it fails."""
+    samples = []
+    for _ in range(repeats):
+        proc = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(mod=module)],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            return None, proc.stderr.strip().splitlines()[-1]
+        samples.append(float(proc.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples), None
+
+
+def time_command(args, repeats: int = 5):
+    """Median wall time of `python main.py <args>`, start to exit."""
+    probe = ("import subprocess, sys, time; t = time.perf_counter(); "
+             f"subprocess.run([sys.executable, 'main.py', *{args!r}], capture_output=True); "
+             "print(time.perf_counter() - t)")
+    samples = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True)
+        samples.append(float(out.stdout.strip()))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-module import cost")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'module':<18} {'import (ms)':>12}")
+    for mod in MODULES:
+        secs, err = time_import(mod, args.repeats)
+        results[mod] = {"import_ms": None if secs is None else secs * 1000, "error": err}
+        shown = f"{secs * 1000:12.1f}" if secs is not None else f"{'n/a':>12}  ({err})"
+        print(f"{mod:<18} {shown}")
+
+    for cmd in (["--help"], ["--metrics"]):
+        ms = time_command(cmd, args.repeats) * 1000
+        results["main.py " + " ".join(cmd)] = {"wall_ms": ms}
+        print(f"{'main.py ' + ' '.join(cmd):<18} {ms:12.1f} (wall)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+# benchmarks/suite.py
+"""
+Hot-path benchmarks with the LLM and scraper replaced by deterministic
+local stubs, so numbers depend only on this code. Each case runs across
+sizes (dishes per station, hash width, sample count) and reports
+throughput, latency percentiles and peak traced memory. Run from the
+repo root:
+
+    python benchmarks/suite.py [--quick] [--out benchmarks/baseline.json]
+    python benchmarks/suite.py --compare benchmarks/baseline.json [--tolerance 0.25]
+
+--compare exits non-zero when any case's p50 is slower than the
+baseline by more than the tolerance.
+"""
+import argparse
+import gc
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from menu_backends import STATIONS, MenuBackend  # noqa: E402
+from simulate_menu import FAKE_WORDS, iter_synthetic  # noqa: E402
+
+SEED = 42
+PROFILE = {"is_vegetarian": False, "favorite_food": ["beef", "spinach"]}
+
+MENU_SIZES = [4, 16, 64]            # dishes per station
+HASH_WIDTHS = [2 ** 10, 2 ** 14, 2 ** 18]
+SAMPLE_COUNTS = [100, 1_000, 10_000]
+ROUND_FEATURES = 2 ** 10
+QUICK = {"menu": [4, 16], "width": [2 ** 10, 2 ** 14], "samples": [100, 1_000]}
+
+
+# -------------------------------------
+# Deterministic stubs
+# -------------------------------------
+def stub_llm_score(menu_text: str, user_profile: dict, **_) -> tuple:
+    """Stands in for llm.llama_score: a stable 1–5 score from the menu hash."""
+    h = hashlib.blake2b(menu_text.encode("utf-8"), digest_size=2).digest()
+    return 1 + int.from_bytes(h, "little") % 5, "stub"
+
+
+class StubBackend(MenuBackend):
+    """Stands in for a scraper: the same (date, meal) always yields the same menu."""
+
+    name = "stub"
+
+    def __init__(self, dishes_per_station: int = 8):
+        self.dishes_per_station = dishes_per_station
+
+    def fetch(self, target_date, meal, stations=STATIONS, detailed=False):
+        rng = random.Random(f"{target_date.isoformat()}|{meal}")
+        return {
+            station: [" ".join(rng.sample(FAKE_WORDS, rng.randint(2, 4))).title()
+                      for _ in range(self.dishes_per_station)]
+            for station in (stations or STATIONS)
+        }
+
+
+def synthetic_rows(n: int, seed: int = SEED):
+    menus, llm, user = [], [], []
+    for m, l, u in iter_synthetic(n, PROFILE, seed=seed, batch_size=max(n, 1)):
+        menus.extend(m)
+        llm.extend(l.tolist())
+        user.extend(u.astype(float).tolist())
+    return menus, llm, user
+
+
+def fitted_learner(n_features: int, rows: int = 500, **kw):
+    from supervised_model import build_learner
+    learner = build_learner(n_features=n_features, **kw)
+    learner.initial_fit(*synthetic_rows(rows))
+    return learner
+
+
+# -------------------------------------
+# Measurement
+# -------------------------------------
+def measure(fn: Callable[[int], object], calls: int, ops_per_call: int = 1,
+            warmup: int = 3, min_seconds: float = 0.0) -> dict:
+    """
+    Time `calls` invocations of fn(i) (plus warmup), then repeat them once
+    under tracemalloc for peak memory, so tracing overhead never skews
+    the latency numbers.
+    """
+    for i in range(warmup):
+        fn(i)
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    samples = []
+    t_start = time.perf_counter()
+    i = 0
+    while i < calls or time.perf_counter() - t_start < min_seconds:
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - t0)
+        i += 1
+    total = time.perf_counter() - t_start
+    if gc_was_enabled:
+        gc.enable()
+
+    tracemalloc.start()
+    for j in range(min(calls, 10)):
+        fn(j)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {
+        "calls": len(samples),
+        "ops_per_sec": len(samples) * ops_per_call / total,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "peak_kib": peak / 1024,
+    }
+
+
+# -------------------------------------
+# Cases (each yields (params, result))
+# -------------------------------------
+def bench_process_menu(sizes):
+    from menu_text import dish_tokens, process_menu_dict
+
+    for per_station in sizes["menu"]:
+        backend = StubBackend(per_station)
+        menus = [backend.fetch(date(2026, 1, 1) + timedelta(days=d), "Lunch") for d in range(200)]
+
+        def run(i, menus=menus):
+            dish_tokens.cache_clear()  # measure cold tokenization, not the LRU
+            process_menu_dict(menus[i % len(menus)])
+
+        yield {"dishes_per_station": per_station}, measure(run, calls=200)
+
+
+def bench_features(sizes):
+    """Menu text (tokenized per menu) vs. scraped dicts (tokens/hashes cached per dish)."""
+    from menu_text import menu_dish_tokens, process_menu_dict
+
+    backend = StubBackend(16)
+    raw = [backend.fetch(date(2026, 1, 1) + timedelta(days=d), "Lunch") for d in range(1_000)]
+    texts = [process_menu_dict(r) for r in raw]
+    for width in sizes["width"]:
+        learner = fitted_learner(width)
+        menus, llm, _ = synthetic_rows(1_000)
+        yield ({"n_features": width, "input": "text"},
+               measure(lambda i: learner.features(menus[i % 1000], llm[i % 1000]), calls=1_000))
+        yield ({"n_features": width, "input": "dishes"},
+               measure(lambda i: learner.features(texts[i % 1000], 3, menu_dish_tokens(raw[i % 1000])),
+                       calls=1_000))
+
+
+def bench_predict(sizes):
+    for width in sizes["width"]:
+        learner = fitted_learner(width)
+        menus, llm, _ = synthetic_rows(1_000)
+        yield {"n_features": width}, measure(lambda i: learner.predict(menus[i % 1000], llm[i % 1000]), calls=1_000)
+
+
+def bench_update(sizes):
+    from main import REPLAY_SIZE, UPDATE_BATCH_SIZE
+
+    for width in sizes["width"]:
+        learner = fitted_learner(width, batch_size=UPDATE_BATCH_SIZE, replay_size=REPLAY_SIZE)
+        menus, llm, user = synthetic_rows(1_000, seed=SEED + 1)
+        yield ({"n_features": width, "batch_size": UPDATE_BATCH_SIZE},
+               measure(lambda i: learner.update(menus[i % 1000], llm[i % 1000], user[i % 1000]), calls=1_000))
+
+
+def bench_initial_fit(sizes):
+    from supervised_model import build_learner
+
+    for width in sizes["width"]:
+        for n in sizes["samples"]:
+            rows = synthetic_rows(n)
+            yield ({"n_features": width, "samples": n},
+                   measure(lambda i: build_learner(n_features=width).initial_fit(*rows),
+                           calls=5, ops_per_call=n, warmup=1))
+
+
+def bench_checkpoint(sizes, tmp: str):
+    """main.save_learner(wait=True) then main.load_or_build_learner() on a temp path."""
+    import main
+
+    for width in sizes["width"]:
+        learner = fitted_learner(width)
+        path = os.path.join(tmp, f"learner_{width}.npz")
+        main.MODEL_PATH = path
+        main._checkpoints = None
+
+        def run(i):
+            with redirect_stdout(io.StringIO()):
+                main.save_learner(learner, wait=True)
+                main.load_or_build_learner()
+
+        yield {"n_features": width}, measure(run, calls=30)
+        main._get_checkpoints().close()
+        main._checkpoints = None
+
+
+def bench_round(sizes, tmp: str):
+    """One interactive round: fetch → process → LLM → predict → rate → update → log."""
+    from interaction_log import InteractionLog
+    from main import REPLAY_SIZE, UPDATE_BATCH_SIZE
+    from menu_text import menu_dish_tokens, process_menu_dict
+    from simulate_menu import SimulatedRater
+
+    rater = SimulatedRater(PROFILE)
+    words = {w: i for i, w in enumerate(FAKE_WORDS)}
+    for per_station in sizes["menu"]:
+        backend = StubBackend(per_station)
+        learner = fitted_learner(ROUND_FEATURES, batch_size=UPDATE_BATCH_SIZE, replay_size=REPLAY_SIZE)
+        log = InteractionLog(os.path.join(tmp, f"round_{per_station}"))
+        rng = np.random.default_rng(SEED)
+
+        def run(i):
+            raw = backend.fetch(date(2026, 1, 1) + timedelta(days=i), "Lunch" if i % 2 else "Dinner")
+            menu, tokens = process_menu_dict(raw), menu_dish_tokens(raw)
+            s_llm, _ = stub_llm_score(menu, PROFILE)
+            pred = learner.predict(menu, s_llm, tokens)
+            idx = np.array([[words[w] for w in menu.split() if w in words][:12] or [0]])
+            _, user = rater.rate(idx, np.array([idx.shape[1]]), rng)
+            learner.update(menu, s_llm, float(user[0]), tokens)
+            log.append(menu, s_llm, float(user[0]), prediction=pred, profile=PROFILE)
+
+        yield {"dishes_per_station": per_station}, measure(run, calls=300)
+        log.close()
+
+
+CASES = {
+    "process_menu_dict": bench_process_menu,
+    "features": bench_features,
+    "predict": bench_predict,
+    "update": bench_update,
+    "initial_fit": bench_initial_fit,
+    "checkpoint": bench_checkpoint,
+    "round": bench_round,
+}
+
+
+def run_suite(sizes: dict, only: Optional[List[str]] = None) -> Dict[str, list]:
+    results: Dict[str, list] = {}
+    with tempfile.TemporaryDirectory(prefix="menumind-bench-") as tmp:
+        for name, case in CASES.items():
+            if only and name not in only:
+                continue
+            args = (sizes, tmp) if name in ("checkpoint", "round") else (sizes,)
+            results[name] = []
+            for params, res in case(*args):
+                results[name].append({"params": params, **res})
+                label = " ".join(f"{k}={v}" for k, v in params.items())
+                print(f"{name:<18} {label:<32} {res['ops_per_sec']:>12,.0f}/s "
+                      f"p50 {res['p50_ms']:8.3f} ms  p95 {res['p95_ms']:8.3f} ms  "
+                      f"peak {res['peak_kib']:9.1f} KiB")
+    return results
+
+
+# -------------------------------------
+# Baseline comparison
+# -------------------------------------
+def compare(current: Dict[str, list], baseline: Dict[str, list], tolerance: float) -> List[str]:
+    """Cases whose p50 regressed by more than `tolerance` (0.25 = 25%)."""
+    regressions = []
+    for name, rows in current.items():
+        base_rows = {json.dumps(r["params"], sort_keys=True): r for r in baseline.get(name, [])}
+        for row in rows:
+            key = json.dumps(row["params"], sort_keys=True)
+            base = base_rows.get(key)
+            if base is None:
+                continue
+            ratio = row["p50_ms"] / base["p50_ms"] if base["p50_ms"] else float("inf")
+            mark = "REGRESSION" if ratio > 1 + tolerance else ""
+            print(f"{name:<18} {key:<48} p50 {base['p50_ms']:8.3f} -> {row['p50_ms']:8.3f} ms "
+                  f"({ratio:5.2f}x) {mark}")
+            if mark:
+                regressions.append(f"{name} {key}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MenuMind hot paths with stubbed LLM and scraper")
+    parser.add_argument("--quick", action="store_true", help="smaller size grid")
+    parser.add_argument("--only", nargs="+", choices=list(CASES), help="run a subset of cases")
+    parser.add_argument("--out", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    sizes = QUICK if args.quick else {"menu": MENU_SIZES, "width": HASH_WIDTHS, "samples": SAMPLE_COUNTS}
+    results = run_suite(sizes, args.only)
+
+    if args.out:
+        payload = {
+            "meta": {"python": platform.python_version(), "numpy": np.__version__,
+                     "machine": platform.machine(), "quick": args.quick, "created": time.time()},
+            "results": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"Wrote baseline to {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"[WARN] {len(regressions)} case(s) slower than baseline by >{args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
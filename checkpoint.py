@@ -0,0 +1,182 @@
+# checkpoint.py
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from supervised_model import Learner, Metrics, build_learner
+
+CHECKPOINT_VERSION = 1
+
+
+# -------------------------------------
+# Compact .npz checkpoint format
+# -------------------------------------
+def _snapshot(learner: Learner) -> dict:
+    """Copy just what is needed to rebuild the learner (arrays + JSON header)."""
+    model = learner.model
+    header = {
+        "version": CHECKPOINT_VERSION,
+        "n_features": learner.vectorizer.n_features,
+        "sgd_params": model.get_params(),
+        "fitted": learner.fitted,
+        "num_samples": learner.num_samples,
+        "batch_size": learner.batch_size,
+        "replay_size": learner.replay_size,
+        "replay_capacity": learner.replay_capacity,
+        "t_": float(getattr(model, "t_", 1.0)),
+        "n_iter_": int(getattr(model, "n_iter_", 0)),
+        "metrics": {
+            "n": learner.metrics.n,
+            "sum_abs": learner.metrics.sum_abs,
+            "sum_sq": learner.metrics.sum_sq,
+            "capacity": learner.metrics.capacity,
+            "window": learner.metrics.window,
+            "stride": learner.metrics.stride,
+        },
+    }
+    history = learner.metrics.history()
+    arrays = {
+        "header": np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+        "metrics_history": np.column_stack([history[c] for c in Metrics.COLUMNS]),
+        "metrics_recent": learner.metrics.recent_errors(),
+    }
+    if getattr(model, "coef_", None) is not None:
+        arrays["coef"] = np.array(model.coef_, dtype=float, copy=True)
+        arrays["intercept"] = np.array(model.intercept_, dtype=float, copy=True)
+    return arrays
+
+
+def _write_atomic(path: str, arrays: dict) -> None:
+    """Write to a temp file in the same directory, then rename into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".ckpt-", suffix=".npz", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def save_checkpoint(learner: Learner, path: str) -> None:
+    _write_atomic(path, _snapshot(learner))
+
+
+def read_header(path: str) -> dict:
+    """Just the JSON header (config, counters, metrics); no model is built."""
+    with np.load(path, allow_pickle=False) as data:
+        return json.loads(bytes(data["header"]).decode("utf-8"))
+
+
+def load_checkpoint(path: str) -> Learner:
+    """Rebuild a Learner from a checkpoint; never unpickles objects."""
+    with np.load(path, allow_pickle=False) as data:
+        header = json.loads(bytes(data["header"]).decode("utf-8"))
+        if header.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version: {header.get('version')}")
+        coef = data["coef"] if "coef" in data else None
+        intercept = data["intercept"] if "intercept" in data else None
+        metrics_history = data["metrics_history"]
+        metrics_recent = data["metrics_recent"]
+
+    learner = build_learner(
+        n_features=header["n_features"],
+        batch_size=header["batch_size"],
+        replay_size=header["replay_size"],
+    )
+    learner.replay_capacity = header["replay_capacity"]
+    learner.model.set_params(**header["sgd_params"])
+    learner.fitted = header["fitted"]
+    learner.num_samples = header["num_samples"]
+    m = header["metrics"]
+    learner.metrics = Metrics(capacity=m["capacity"], window=m["window"])
+    learner.metrics.n = m["n"]
+    learner.metrics.sum_abs = m["sum_abs"]
+    learner.metrics.sum_sq = m["sum_sq"]
+    learner.metrics.restore(metrics_history, metrics_recent, m["stride"])
+
+    if coef is not None:
+        model = learner.model
+        model.coef_ = coef
+        model.intercept_ = intercept
+        model.n_features_in_ = coef.shape[0]
+        model.t_ = header["t_"]
+        model.n_iter_ = header["n_iter_"]
+    return learner
+
+
+# -------------------------------------
+# Debounced background writer
+# -------------------------------------
+class CheckpointWriter:
+    """
+    save() snapshots the learner and returns immediately; a background
+    thread writes the newest snapshot at most once every min_interval
+    seconds. flush() writes any pending snapshot and waits for it.
+    """
+
+    def __init__(self, path: str, min_interval: float = 5.0):
+        self.path = path
+        self.min_interval = min_interval
+        self._pending: Optional[dict] = None
+        self._cond = threading.Condition()
+        self._last_write = float("-inf")
+        self._writing = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, learner: Learner) -> None:
+        snap = _snapshot(learner)
+        with self._cond:
+            self._pending = snap
+            self._cond.notify_all()
+
+    def flush(self) -> None:
+        with self._cond:
+            while self._pending is not None or self._writing:
+                self._last_write = float("-inf")  # skip the debounce delay
+                self._cond.notify_all()
+                self._cond.wait()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None and self._closed:
+                    return
+                delay = self._last_write + self.min_interval - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(timeout=delay)
+                    continue
+                snap, self._pending = self._pending, None
+                self._writing = True
+            try:
+                _write_atomic(self.path, snap)
+            except Exception as e:
+                print(f"[WARN] Checkpoint write failed: {e}")
+            with self._cond:
+                self._writing = False
+                self._last_write = time.monotonic()
+                self._cond.notify_all()
@@ -0,0 +1,232 @@
+# interaction_log.py
+import atexit
+import csv
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from cache import make_key
+
+LOG_PATH = "data/interactions"   # -> interactions.bin + interactions.menus.txt
+FSYNC_INTERVAL = 2.0             # seconds between fsyncs of buffered appends
+BUFFER_SIZE = 1 << 16
+
+# Fixed-width numeric columns; row i's menu text is line i of the .menus.txt file
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("profile_id", "<u8"),
+    ("llm_score", "<f4"),
+    ("user_score", "<f4"),
+    ("prediction", "<f4"),
+    ("menu_offset", "<u8"),
+    ("menu_len", "<u4"),
+])
+
+
+def profile_id(profile: dict) -> int:
+    """Stable 64-bit id for a profile dict."""
+    return int(make_key(profile)[:16], 16)
+
+
+class InteractionLog:
+    """
+    Append-only interaction store: numeric columns in a binary file of
+    RECORD_DTYPE rows (readable in one np.fromfile/np.memmap), menu text
+    in a parallel UTF-8 file. Appends go through buffered handles that
+    are flushed and fsynced every fsync_interval seconds and on close.
+    """
+
+    def __init__(self, path: str = LOG_PATH, fsync_interval: float = FSYNC_INTERVAL):
+        self.bin_path = path + ".bin"
+        self.text_path = path + ".menus.txt"
+        self.fsync_interval = fsync_interval
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._n, text_end = self._recover()
+        self._bin = open(self.bin_path, "ab", buffering=BUFFER_SIZE)
+        self._text = open(self.text_path, "ab", buffering=BUFFER_SIZE)
+        self._text_end = text_end
+        self._last_sync = time.monotonic()
+        atexit.register(self.close)
+
+    def _recover(self):
+        """Drop a torn trailing record / text left by a crash mid-append."""
+        for p in (self.bin_path, self.text_path):
+            if not os.path.exists(p):
+                open(p, "wb").close()
+        size = os.path.getsize(self.bin_path)
+        n = size // RECORD_DTYPE.itemsize
+        if size != n * RECORD_DTYPE.itemsize:
+            os.truncate(self.bin_path, n * RECORD_DTYPE.itemsize)
+        text_end = 0
+        if n:
+            recs = np.memmap(self.bin_path, dtype=RECORD_DTYPE, mode="r", shape=(n,))
+            ends = recs["menu_offset"] + recs["menu_len"] + 1
+            # Keep only records whose text made it to disk
+            n = int(np.searchsorted(ends, os.path.getsize(self.text_path), side="right"))
+            text_end = int(ends[n - 1]) if n else 0
+            del recs
+            os.truncate(self.bin_path, n * RECORD_DTYPE.itemsize)
+        if os.path.getsize(self.text_path) != text_end:
+            os.truncate(self.text_path, text_end)
+        return n, text_end
+
+    def __len__(self) -> int:
+        return self._n
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+    def append(self, menu: str, llm_score: float, user_score: float,
+               prediction: float = float("nan"), profile: Optional[dict] = None,
+               timestamp: Optional[float] = None) -> None:
+        data = " ".join(menu.split()).encode("utf-8")  # one line per menu
+        rec = np.zeros(1, dtype=RECORD_DTYPE)
+        rec["timestamp"] = time.time() if timestamp is None else timestamp
+        rec["profile_id"] = profile_id(profile) if profile is not None else 0
+        rec["llm_score"] = llm_score
+        rec["user_score"] = user_score
+        rec["prediction"] = prediction
+        rec["menu_offset"] = self._text_end
+        rec["menu_len"] = len(data)
+
+        # Text first, so a record never points past the text on disk
+        self._text.write(data + b"\n")
+        self._bin.write(rec.tobytes())
+        self._text_end += len(data) + 1
+        self._n += 1
+
+        if time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def append_many(self, menus: List[str], llm_scores, user_scores, predictions=None,
+                    profile: Optional[dict] = None, timestamps=None) -> None:
+        """Vectorized append of many rows (one write per file)."""
+        n = len(menus)
+        if n == 0:
+            return
+        blobs = [" ".join(m.split()).encode("utf-8") for m in menus]
+        lengths = np.fromiter((len(b) for b in blobs), dtype=np.uint64, count=n)
+        offsets = np.cumsum(lengths + 1) - (lengths + 1) + np.uint64(self._text_end)
+
+        recs = np.zeros(n, dtype=RECORD_DTYPE)
+        recs["timestamp"] = time.time() if timestamps is None else timestamps
+        recs["profile_id"] = profile_id(profile) if profile is not None else 0
+        recs["llm_score"] = llm_scores
+        recs["user_score"] = user_scores
+        recs["prediction"] = np.nan if predictions is None else predictions
+        recs["menu_offset"] = offsets
+        recs["menu_len"] = lengths
+
+        self._text.write(b"\n".join(blobs) + b"\n")
+        self._bin.write(recs.tobytes())
+        self._text_end += int(lengths.sum()) + n
+        self._n += n
+
+        if time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        for f in (self._text, self._bin):
+            f.flush()
+            os.fsync(f.fileno())
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if self._bin.closed:
+            return
+        self.sync()
+        self._bin.close()
+        self._text.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -----------------------------
+    # Reading
+    # -----------------------------
+    def records(self) -> np.ndarray:
+        """All numeric columns as a read-only structured memmap."""
+        self._flush_buffers()
+        if self._n == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.bin_path, dtype=RECORD_DTYPE, mode="r", shape=(self._n,))
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Columns for rows [start, stop) plus their menu texts under 'menu'."""
+        recs = self.records()[start:stop]
+        cols = {name: np.array(recs[name]) for name in RECORD_DTYPE.names}
+        cols["menu"] = self._menus_for(recs)
+        return cols
+
+    def iter_chunks(self, chunk_size: int = 1024, shuffle: bool = False,
+                    rng: Optional[np.random.Generator] = None,
+                    profile: Optional[dict] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Yield read() dicts of at most chunk_size rows. shuffle visits the
+        contiguous chunks in random order and permutes rows inside each, so
+        memory stays O(chunk_size) however long the log is.
+        """
+        n = self._n
+        starts = np.arange(0, n, chunk_size)
+        if shuffle:
+            rng = rng or np.random.default_rng()
+            rng.shuffle(starts)
+        pid = profile_id(profile) if profile is not None else None
+        for start in starts.tolist():
+            cols = self.read(start, min(start + chunk_size, n))
+            keep = np.ones(len(cols["menu"]), dtype=bool)
+            if pid is not None:
+                keep &= cols["profile_id"] == pid
+            idx = np.flatnonzero(keep)
+            if shuffle:
+                rng.shuffle(idx)
+            if len(idx) == 0:
+                continue
+            out = {k: v[idx] for k, v in cols.items() if k != "menu"}
+            out["menu"] = [cols["menu"][i] for i in idx.tolist()]
+            yield out
+
+    def _menus_for(self, recs: np.ndarray) -> List[str]:
+        if len(recs) == 0:
+            return []
+        lo = int(recs["menu_offset"].min())
+        hi = int((recs["menu_offset"] + recs["menu_len"]).max())
+        with open(self.text_path, "rb") as f:
+            f.seek(lo)
+            blob = f.read(hi - lo)
+        return [blob[o - lo:o - lo + n].decode("utf-8")
+                for o, n in zip(recs["menu_offset"].tolist(), recs["menu_len"].tolist())]
+
+    def _flush_buffers(self) -> None:
+        if not self._bin.closed:
+            self._text.flush()
+            self._bin.flush()
+
+    # -----------------------------
+    # CSV import
+    # -----------------------------
+    def import_csv(self, csv_path: str) -> int:
+        """Append every row of an old menu,llm_score,user_score CSV."""
+        count = 0
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self.append(row["menu"], float(row["llm_score"]), float(row["user_score"]),
+                            timestamp=0.0)
+                count += 1
+        self.sync()
+        return count
+
+    def import_csv_once(self, csv_path: str) -> int:
+        """Import the CSV only into an empty log, so it happens exactly once."""
+        if self._n or not os.path.exists(csv_path):
+            return 0
+        count = self.import_csv(csv_path)
+        print(f"Imported {count} rows from {csv_path} into the interaction log.")
+        return count
@@ -1,15 +1,174 @@
-import ollama
+import asyncio
 import json
-from typing import Tuple
+import math
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cache import DiskCache, make_key, normalize_text
+from tracing import span
 
 MODEL_NAME = "llama3.1:8b"
+SCORE_CACHE_PATH = "data/llm_cache.sqlite"
+MAX_CONCURRENCY = 4
+
+# Structured / streaming mode
+KEEP_ALIVE = "30m"     # keep the model resident between rounds
+NUM_PREDICT = 64       # enough for {"score": n, "rationale": "<=140 chars"}
+SCORE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "minimum": 1, "maximum": 5},
+        "rationale": {"type": "string", "maxLength": 140},
+    },
+    "required": ["score", "rationale"],
+}
+_SCORE_RE = re.compile(r'"score"\s*:\s*(\d+)(?=\s*[,}])')
+_RATIONALE_RE = re.compile(r'"rationale"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+# Deadline / circuit breaker
+LLM_TIMEOUT = 30.0       # seconds per call, including a cold model load
+BREAKER_FAILURES = 3     # consecutive failures that open the breaker
+BREAKER_COOLDOWN = 60.0  # seconds to skip the LLM once open
+NEUTRAL_SCORE = 3        # LLM feature value used for model-only estimates
 
-def llama_score(menu_text: str, user_profile: dict, model: str = MODEL_NAME) -> Tuple[int, str]:
+
+class LLMScore(tuple):
     """
-    Ask Llama (via Ollama) for a base 1–5 score + short rationale.
-    We instruct it to ignore protected attributes for scoring.
+    (score, rationale) that also says where the score came from:
+    "llm" for a real (or cached) LLM answer, "model" for a learner-only
+    estimate and "default" for the neutral fallback. Unpacks like the
+    plain tuple callers already use.
+    """
+
+    def __new__(cls, score: int, rationale: str, source: str = "llm"):
+        self = super().__new__(cls, (score, rationale))
+        self.source = source
+        return self
+
+    def __getnewargs__(self):
+        # pickle and copy rebuild through __new__; tuple's default passes one arg
+        return self[0], self[1], self.source
+
+    @property
+    def fallback(self) -> bool:
+        return self.source != "llm"
+
+
+FALLBACK = LLMScore(NEUTRAL_SCORE, "Fallback (parse or connection error).", source="default")
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing backend: after `failures` consecutive errors
+    the breaker opens and allow() is False for `cooldown` seconds, then a
+    single trial call is let through (success closes it, failure reopens).
     """
-    print("\nOllama model:", MODEL_NAME)
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._count = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial:
+                return False
+            self._trial = True  # one probe at a time while half-open
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self._count = 0
+            self._opened_at = None
+            self._trial = False
+
+    def release(self) -> None:
+        """End a half-open trial that neither succeeded nor failed (cancelled)."""
+        with self._lock:
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._count += 1
+            self._trial = False
+            if self._opened_at is not None or self._count >= self.failures:
+                if self._opened_at is None:
+                    print(f"[WARN] LLM circuit open for {self.cooldown:.0f}s after {self._count} failures")
+                self._opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker()
+
+
+class LLMCancelled(Exception):
+    """The caller's cancel event was set while a reply was streaming."""
+
+_score_cache: Optional[DiskCache] = None
+_clients: dict = {}
+last_timing: dict = {}
+
+
+def get_score_cache() -> DiskCache:
+    """Shared on-disk cache of (menu, profile, model) -> (score, rationale)."""
+    global _score_cache
+    if _score_cache is None:
+        _score_cache = DiskCache(SCORE_CACHE_PATH)
+    return _score_cache
+
+
+def score_cache_key(menu_text: str, user_profile: dict, model: str = MODEL_NAME) -> str:
+    return make_key(normalize_text(menu_text), make_key(user_profile), model)
+
+
+def _client(timeout: float):
+    """Shared ollama.Client per timeout (its HTTP calls give up after `timeout`)."""
+    client = _clients.get(timeout)
+    if client is None:
+        import ollama
+        client = _clients[timeout] = ollama.Client(timeout=timeout)
+    return client
+
+
+# -----------------------------
+# Fallbacks
+# -----------------------------
+def model_fallback(learner) -> Callable[[str], Optional[float]]:
+    """Model-only estimate from a fitted Learner (None while it is unfitted)."""
+    return lambda menu_text: learner.predict_raw(menu_text, NEUTRAL_SCORE)
+
+
+def fallback_score(menu_text: str, fallback: Optional[Callable[[str], Optional[float]]],
+                   reason: str) -> LLMScore:
+    """Learner estimate when one is available, else the neutral FALLBACK."""
+    if fallback is not None:
+        try:
+            est = fallback(menu_text)
+        except Exception as e:
+            print(f"[WARN] Model fallback failed: {e}")
+            est = None
+        if est is not None and math.isfinite(est):
+            score = max(1, min(5, int(math.floor(est + 0.5))))
+            return LLMScore(score, f"Model-only estimate ({reason}).", source="model")
+    return FALLBACK
+
+
+# -----------------------------
+# Prompt / reply helpers
+# -----------------------------
+def _build_messages(menu_text: str, user_profile: dict) -> List[dict]:
     sys_rules = (
         "You are a careful dining advisor. "
         "Your job is to evaluate whether a user should visit the dining hall "
@@ -24,20 +183,318 @@ def llama_score(menu_text: str, user_profile: dict, model: str = MODEL_NAME) ->
     Output strict JSON only, like this:
     {{"score": 4, "rationale": "Good variety of vegetarian options and safe for allergies."}}
     """
+    return [{"role": "system", "content": sys_rules},
+            {"role": "user", "content": prompt}]
+
+
+def _build_dish_messages(dish: str, user_profile: dict) -> List[dict]:
+    sys_rules = (
+        "You are a careful dining advisor. "
+        "Rate how appealing and suitable ONE dish is for the user, considering "
+        "dietary needs, allergies, and food preferences. Ignore protected attributes such as race. "
+        "Return ONLY valid JSON with integer 'score' (1–5) and string 'rationale' (≤140 chars)."
+    )
+    prompt = f"""User profile: {json.dumps(user_profile, ensure_ascii=False)}
+    Dish: {dish}
+    Rate this DISH from 1 (would not eat) to 5 (would love it).
+    Output strict JSON only, like this:
+    {{"score": 4, "rationale": "High-protein and matches a favorite food."}}
+    """
+    return [{"role": "system", "content": sys_rules},
+            {"role": "user", "content": prompt}]
+
 
+def _parse_reply(reply: str) -> Tuple[int, str]:
+    obj = json.loads(reply.strip())
+    score = int(obj.get("score", 3))
+    why = obj.get("rationale", "LLM rationale unavailable.")
+    return max(1, min(5, score)), why
+
+
+# -----------------------------
+# Single menu
+# -----------------------------
+def _structured_chat(menu_text: str, user_profile: dict, model: str,
+                     need_rationale: bool = True, timeout: float = LLM_TIMEOUT,
+                     cancel: Optional[threading.Event] = None) -> Tuple[int, str]:
+    """
+    Stream a schema-constrained reply and stop as soon as the fields we
+    need are parsed, or raise TimeoutError once `timeout` seconds have
+    passed (LLMCancelled once `cancel` is set). Records time-to-first-token
+    and total latency in `last_timing`.
+    """
+    t0 = time.perf_counter()
+    deadline = t0 + timeout
+    ttft = None
+    buf = ""
+    score, why = None, ""
+    stream = _client(timeout).chat(
+        model=model,
+        messages=_build_messages(menu_text, user_profile),
+        format=SCORE_SCHEMA,
+        options={"num_predict": NUM_PREDICT, "temperature": 0},
+        keep_alive=KEEP_ALIVE,
+        stream=True,
+    )
     try:
-        response = ollama.chat(
-            model=MODEL_NAME,
-            messages=[{"role": "system", "content": sys_rules},
-                      {"role": "user", "content": prompt}]
-        )
-        reply = response["message"]["content"].strip()
-        obj = json.loads(reply)
-        score = int(obj.get("score", 3))
-        why = obj.get("rationale", "LLM rationale unavailable.")
-    except Exception as e:
-        print(f"[WARN] LLM error: {e}")
-        score, why = 3, "Fallback (parse or connection error)."
-
-    score = max(1, min(5, score))
-    return score, why
\ No newline at end of file
+        for chunk in stream:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"LLM deadline of {timeout:.0f}s exceeded")
+            if cancel is not None and cancel.is_set():
+                raise LLMCancelled()
+            piece = chunk["message"]["content"]
+            if ttft is None and piece:
+                ttft = time.perf_counter() - t0
+            buf += piece
+            if score is None:
+                m = _SCORE_RE.search(buf)
+                if m:
+                    score = int(m.group(1))
+            if score is not None and not need_rationale:
+                break
+            m = _RATIONALE_RE.search(buf)
+            if score is not None and m:
+                why = json.loads(f'"{m.group(1)}"')
+                break
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()  # drops the HTTP stream so Ollama stops generating
+
+    last_timing.clear()
+    last_timing.update({"ttft": ttft, "total": time.perf_counter() - t0, "chars": len(buf)})
+
+    if score is None:
+        raise ValueError(f"no score in structured reply: {buf!r}")
+    return max(1, min(5, score)), why or "LLM rationale unavailable."
+
+
+def llama_score(menu_text: str, user_profile: dict, model: str = MODEL_NAME,
+                use_cache: bool = True, structured: bool = False,
+                need_rationale: bool = True, timeout: float = LLM_TIMEOUT,
+                fallback: Optional[Callable[[str], Optional[float]]] = None,
+                cancel: Optional[threading.Event] = None, verbose: bool = True) -> LLMScore:
+    """
+    Ask Llama (via Ollama) for a base 1–5 score + short rationale.
+    We instruct it to ignore protected attributes for scoring.
+    Successful answers are cached on disk; fallbacks are never cached.
+
+    structured=True uses Ollama's JSON-schema output with a capped
+    num_predict, keep-alive and early-stopping streaming (see last_timing).
+
+    Each call is abandoned after `timeout` seconds. On error, timeout or
+    an open circuit breaker the result comes from `fallback(menu_text)`
+    (see model_fallback) or FALLBACK, with .fallback set so callers can
+    keep it out of training data.
+
+    Setting `cancel` aborts a structured stream (the result is FALLBACK);
+    verbose=False keeps background callers from printing over a prompt.
+    """
+    with span("llm", model=model, size=len(menu_text), cache_hit=False) as s:
+        key = score_cache_key(menu_text, user_profile, model)
+        if use_cache:
+            hit = get_score_cache().get(key)
+            if hit is not None:
+                s["cache_hit"] = True
+                if verbose:
+                    print("\n[LLM cache hit]", model)
+                return LLMScore(int(hit[0]), hit[1])
+
+        if not breaker.allow():
+            s["fallback"] = True
+            return fallback_score(menu_text, fallback, "LLM circuit open")
+
+        if verbose:
+            print("\nOllama model:", model)
+        try:
+            if structured:
+                score, why = _structured_chat(menu_text, user_profile, model, need_rationale, timeout, cancel)
+                if verbose:
+                    print(f"[LLM latency] ttft={last_timing['ttft'] or 0:.3f}s total={last_timing['total']:.3f}s")
+            else:
+                response = _client(timeout).chat(model=model, messages=_build_messages(menu_text, user_profile))
+                score, why = _parse_reply(response["message"]["content"])
+        except LLMCancelled:
+            breaker.release()
+            s["cancelled"] = True
+            return FALLBACK
+        except Exception as e:
+            if verbose:
+                print(f"[WARN] LLM error: {e}")
+            breaker.failure()
+            s["fallback"] = True
+            return fallback_score(menu_text, fallback, "LLM unavailable")
+        breaker.success()
+
+        if use_cache and (need_rationale or not structured):
+            get_score_cache().set(key, [score, why])
+        return LLMScore(score, why)
+
+
+# -----------------------------
+# Batch of menus
+# -----------------------------
+async def _score_one_async(client, sem: asyncio.Semaphore, messages: List[dict],
+                           model: str, timeout: float = LLM_TIMEOUT, **chat_kwargs) -> LLMScore:
+    async with sem:
+        if not breaker.allow():
+            return FALLBACK
+        try:
+            # wait_for cancels the request task (closing its connection) at the deadline
+            response = await asyncio.wait_for(
+                client.chat(model=model, messages=messages, **chat_kwargs), timeout)
+            score, why = _parse_reply(response["message"]["content"])
+        except Exception as e:
+            print(f"[WARN] LLM error: {e!r}")
+            breaker.failure()
+            return FALLBACK
+        breaker.success()
+        return LLMScore(score, why)
+
+
+async def llama_score_batch_async(menus: List[str], user_profile: dict, model: str = MODEL_NAME,
+                                  max_concurrency: int = MAX_CONCURRENCY,
+                                  use_cache: bool = True,
+                                  fallback: Optional[Callable[[str], Optional[float]]] = None
+                                  ) -> List[LLMScore]:
+    """
+    Score many menus concurrently through ollama.AsyncClient.
+    Results keep the order of `menus`; a failed item falls back on its own
+    (to `fallback(menu)` when given, as in llama_score).
+    """
+    results: List[Optional[LLMScore]] = [None] * len(menus)
+    keys = [score_cache_key(m, user_profile, model) for m in menus]
+
+    # Cache first, and send each distinct missing menu only once
+    pending = {}
+    for i, key in enumerate(keys):
+        hit = get_score_cache().get(key) if use_cache else None
+        if hit is not None:
+            results[i] = LLMScore(int(hit[0]), hit[1])
+        else:
+            pending.setdefault(key, []).append(i)
+
+    if pending:
+        print(f"\nOllama model: {model} | scoring {len(pending)} menus "
+              f"(concurrency={max_concurrency})")
+        import ollama
+        client = ollama.AsyncClient()
+        sem = asyncio.Semaphore(max_concurrency)
+        order = list(pending.items())
+        scored = await asyncio.gather(*[
+            _score_one_async(client, sem, _build_messages(menus[idx[0]], user_profile), model)
+            for _, idx in order
+        ])
+        for (key, idx), res in zip(order, scored):
+            if res is FALLBACK:
+                res = fallback_score(menus[idx[0]], fallback, "LLM unavailable")
+            elif use_cache:
+                get_score_cache().set(key, list(res))
+            for i in idx:
+                results[i] = res
+
+    return results
+
+
+def llama_score_batch(menus: List[str], user_profile: dict, model: str = MODEL_NAME,
+                      max_concurrency: int = MAX_CONCURRENCY,
+                      use_cache: bool = True,
+                      fallback: Optional[Callable[[str], Optional[float]]] = None) -> List[LLMScore]:
+    """Synchronous wrapper around llama_score_batch_async."""
+    return asyncio.run(llama_score_batch_async(
+        menus, user_profile, model=model,
+        max_concurrency=max_concurrency, use_cache=use_cache, fallback=fallback,
+    ))
+
+
+# -----------------------------
+# Dish-level scoring
+# -----------------------------
+TOP_K_DISHES = 3      # a menu is as good as its best few options
+TIE_MARGIN = 0.15     # |aggregate - (x + 0.5)| below this counts as a tie
+
+
+def dish_cache_key(dish: str, user_profile: dict, model: str = MODEL_NAME) -> str:
+    return make_key("dish", normalize_text(dish), make_key(user_profile), model)
+
+
+async def score_dishes_async(dishes: List[str], user_profile: dict, model: str = MODEL_NAME,
+                             max_concurrency: int = MAX_CONCURRENCY,
+                             fallback: Optional[Callable[[str], Optional[float]]] = None
+                             ) -> Dict[str, LLMScore]:
+    """
+    Score each distinct dish once per (profile, model). Known dishes come
+    from the persistent cache; only new ones reach the LLM, concurrently.
+    A failed dish gets `fallback(dish)` (source "model", never cached)
+    when that gives an estimate, and is left out otherwise.
+    """
+    cache = get_score_cache()
+    scores: Dict[str, LLMScore] = {}
+    missing: Dict[str, str] = {}
+    for dish in dishes:
+        norm = normalize_text(dish)
+        if not norm or norm in scores or norm in missing:
+            continue
+        hit = cache.get(dish_cache_key(dish, user_profile, model))
+        if hit is not None:
+            scores[norm] = LLMScore(int(hit[0]), hit[1])
+        else:
+            missing[norm] = dish
+
+    if missing:
+        import ollama
+        print(f"\nOllama model: {model} | scoring {len(missing)} new dishes")
+        client = ollama.AsyncClient()
+        sem = asyncio.Semaphore(max_concurrency)
+        results = await asyncio.gather(*[
+            _score_one_async(client, sem, _build_dish_messages(dish, user_profile), model,
+                             format=SCORE_SCHEMA, keep_alive=KEEP_ALIVE,
+                             options={"num_predict": NUM_PREDICT, "temperature": 0})
+            for dish in missing.values()
+        ])
+        for (norm, dish), res in zip(missing.items(), results):
+            if res is FALLBACK:
+                res = fallback_score(dish, fallback, "LLM unavailable")
+                if res is not FALLBACK:
+                    scores[norm] = res
+                continue
+            scores[norm] = res
+            cache.set(dish_cache_key(dish, user_profile, model), list(res))
+    return scores
+
+
+def aggregate_dish_scores(scores: Dict[str, LLMScore], top_k: int = TOP_K_DISHES) -> float:
+    """Mean of the top_k dish scores, on the same 1–5 scale as the menu score."""
+    best = sorted((s[0] for s in scores.values()), reverse=True)[:top_k]
+    return sum(best) / len(best)
+
+
+def llama_score_dishes(dishes: List[str], user_profile: dict, model: str = MODEL_NAME,
+                       menu_text: Optional[str] = None, tie_break: bool = False,
+                       fallback: Optional[Callable[[str], Optional[float]]] = None) -> LLMScore:
+    """
+    Menu-level 1–5 score built from cached per-dish scores. With
+    tie_break=True and menu_text given, an aggregate that lands close to
+    x.5 is settled by the (cached) full-menu llama_score call. If no dish
+    could be scored, falls back as llama_score does; if some dishes only
+    have model estimates, the result's source is "model".
+    """
+    with span("llm_dishes", model=model, size=len(dishes)):
+        scores = asyncio.run(score_dishes_async(dishes, user_profile, model=model, fallback=fallback))
+    if menu_text is not None and all(s.fallback for s in scores.values()):
+        # No dish reached the LLM: one full-menu call (or menu-level estimate)
+        return llama_score(menu_text, user_profile, model=model, fallback=fallback)
+    if not scores:
+        return FALLBACK
+
+    agg = aggregate_dish_scores(scores)
+    if tie_break and menu_text is not None and abs(agg - math.floor(agg) - 0.5) < TIE_MARGIN:
+        res = llama_score(menu_text, user_profile, model=model)
+        if not res.fallback:  # otherwise the dish aggregate below still stands
+            return LLMScore(res[0], f"Tie-break on {agg:.2f}: {res[1]}")
+
+    score = max(1, min(5, int(math.floor(agg + 0.5))))
+    top = sorted(scores.items(), key=lambda kv: -kv[1][0])[:TOP_K_DISHES]
+    why = "Best options: " + ", ".join(f"{dish} ({s[0]})" for dish, s in top)
+    source = "model" if any(s.fallback for s in scores.values()) else "llm"
+    return LLMScore(score, why[:140], source=source)
@@ -1,79 +1,118 @@
 from datetime import date
+import argparse
 import json
+import math
 import time
-import re
 from typing import List
 import os
-import joblib
 
+# Heavy subsystems (scikit-learn, Selenium, ollama, matplotlib) are imported
+# inside the functions that use them, so quick invocations start fast.
 from simulate_menu import generate_fake_menu
-from menu_scraper import menu_scraper
-from supervised_model import build_learner
-from llm import llama_score
-from plot import plot_metrics
+from menu_text import menu_dish_tokens, process_menu_dict
+from tracing import span
 
 MIN_ROWS_TO_TRAIN = 50
 ROUNDS = 35
-CSV_PATH = "data/dining_data.csv"
-MODEL_PATH = "learner.pkl"
+SYNTHETIC_ROUNDS = 30   # warm-up rounds on simulated menus
+PREFETCH_DEPTH = 3      # menus scored ahead while the user is rating
+CSV_PATH = "data/dining_data.csv"     # legacy log, imported once
+LOG_PATH = "data/interactions"
+MODEL_PATH = "learner.npz"
+LEGACY_MODEL_PATH = "learner.pkl"
+CHECKPOINT_INTERVAL = 5.0  # seconds between background checkpoint writes
+WARM_START_EPOCHS = 3
+UPDATE_BATCH_SIZE = 4   # ratings per online mini-batch
+REPLAY_SIZE = 8         # past ratings replayed into each mini-batch
+LLM_STRUCTURED = True  # JSON-schema output + early-stopping stream
+LLM_DISH_MODE = True   # score real menus dish by dish (cached), full menu as tie-break
+MENU_BACKEND = os.environ.get("MENUMIND_BACKEND", "selenium")  # "selenium" or "http"
 
 
 # -----------------------------
 # Saving / loading model
 # -----------------------------
+_checkpoints = None
+
+
+def _get_checkpoints():
+    global _checkpoints
+    if _checkpoints is None:
+        from checkpoint import CheckpointWriter
+        _checkpoints = CheckpointWriter(MODEL_PATH, min_interval=CHECKPOINT_INTERVAL)
+    return _checkpoints
+
+
 def load_or_build_learner():
     """Load saved model if exists, otherwise create a new learner."""
+    from checkpoint import load_checkpoint, save_checkpoint
+    from supervised_model import build_learner
+
     if os.path.exists(MODEL_PATH):
         print("Loading existing learner from disk...")
-        learner = joblib.load(MODEL_PATH)
+        learner = load_checkpoint(MODEL_PATH)
+        print("Model loaded successfully.\n")
+        return learner
+    elif os.path.exists(LEGACY_MODEL_PATH):
+        # One-time migration from the old pickled format (trusted local file)
+        import joblib
+        print(f"Migrating {LEGACY_MODEL_PATH} to {MODEL_PATH}...")
+        learner = joblib.load(LEGACY_MODEL_PATH)
+        save_checkpoint(learner, MODEL_PATH)
         print("Model loaded successfully.\n")
         return learner
     else:
         print("No saved model found. Creating a new learner...\n")
-        return build_learner()
+        return build_learner(batch_size=UPDATE_BATCH_SIZE, replay_size=REPLAY_SIZE)
 
 
-def save_learner(learner):
-    """Save model to disk."""
-    joblib.dump(learner, MODEL_PATH)
-    print("[Model saved]")
+def save_learner(learner, wait: bool = False):
+    """Queue a debounced background checkpoint; wait=True blocks until written."""
+    with span("save", wait=wait):
+        _get_checkpoints().save(learner)
+        if wait:
+            _get_checkpoints().flush()
+    if wait:
+        print("[Model saved]")
 
 
 # -----------------------------
-# CSV appending helper
+# Main
 # -----------------------------
-def append_csv(path: str, row: dict) -> None:
-    import csv
-    exists = os.path.exists(path)
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["menu", "llm_score", "user_score"])
-        if not exists:
-            writer.writeheader()
-        writer.writerow(row)
+def print_metrics():
+    """Print saved model counters and metrics without loading scikit-learn."""
+    if not os.path.exists(MODEL_PATH):
+        print("No saved model found.")
+        return
+    from checkpoint import read_header
+    header = read_header(MODEL_PATH)
+    m = header["metrics"]
+    print(f"Samples trained: {header['num_samples']} | fitted: {header['fitted']}")
+    if m["n"] == 0:
+        print("MAE=None, RMSE=None, n=0")
+    else:
+        print(f"MAE={m['sum_abs'] / m['n']:.3f}, RMSE={math.sqrt(m['sum_sq'] / m['n']):.3f}, n={m['n']}")
 
 
-# -----------------------------
-# Menu processing
-# -----------------------------
-def process_menu_dict(menu_dict):
-    stop_words = {'and', 'with', 'a', 'the', 'of', 'in', 'for', 'is', 'on', 'or', 'just'}
-    all_words = []
+def score_once(menu: str):
+    """Score a single menu with the LLM and saved learner, then exit."""
+    from llm import llama_score, model_fallback
 
-    for _, dishes_list in menu_dict.items():
-        for text_item in dishes_list:
-            text_item = text_item.lower()
-            words = re.findall(r'\b\w+\b', text_item)
-            filtered_words = [word for word in words 
-                              if word not in stop_words and len(word) >= 3]
-            all_words.extend(filtered_words)
-
-    return " ".join(all_words)
+    with open('profile.json', 'r') as file:
+        profile = json.load(file)
+    learner = load_or_build_learner()
+    res = llama_score(menu, profile, structured=LLM_STRUCTURED, fallback=model_fallback(learner))
+    s_llm, why = res
+    pred = learner.predict(menu, s_llm)
+    print(f"LLM score: {s_llm} | Rationale: {why}" + (f" [{res.source}]" if res.fallback else ""))
+    print(f"Prediction: {pred:.2f}")
 
 
-# -----------------------------
-# Main
-# -----------------------------
 def main():
+    from interaction_log import InteractionLog
+    from llm import llama_score, llama_score_dishes, get_score_cache, model_fallback
+    from menu_cache import MenuCache
+    from supervised_model import train_from_log
 
     print("\n=== Adaptive Dining Advisor (LLM + Online Regression) ===\n")
 
@@ -81,6 +120,28 @@ def main():
         profile = json.load(file)
 
     learner = load_or_build_learner()
+    menu_cache = MenuCache()
+    backend = None  # built on first real-menu round (may start a browser)
+    log = InteractionLog(LOG_PATH)
+    log.import_csv_once(CSV_PATH)
+
+    # Bootstrap a fresh learner from ratings stored by earlier sessions
+    if not learner.fitted and len(log) >= MIN_ROWS_TO_TRAIN:
+        rows = train_from_log(learner, log, epochs=WARM_START_EPOCHS)
+        if learner.fitted:
+            save_learner(learner, wait=True)
+            print(f"[Warm start] Trained on {rows} logged ratings ({WARM_START_EPOCHS} epochs).\n")
+
+    # Prepare upcoming simulated menus and their LLM scores in the background
+    from prefetch import Prefetcher, synthetic_source
+    # When the LLM is down, rounds use the learner's own estimate instead
+    fallback = model_fallback(learner)
+    prefetcher = Prefetcher(
+        synthetic_source(min(SYNTHETIC_ROUNDS, ROUNDS), generate_fake_menu),
+        lambda m, _, cancel: llama_score(m, profile, structured=LLM_STRUCTURED, fallback=fallback,
+                                         cancel=cancel, verbose=False),
+        depth=PREFETCH_DEPTH,
+    )
 
     menus: List[str] = []
     llm_scores: List[int] = []
@@ -93,9 +154,13 @@ def main():
         # ==========================================================
         #  FIRST 20 ROUNDS: USE FAKE MENU
         # ==========================================================
-        if t <= 30:
+        dishes = None
+        tokens = None   # per-dish tokens of a scraped menu, reused by the learner
+        prepared = None
+        if t <= SYNTHETIC_ROUNDS:
             print("=== Using simulated menu for warm-up training ===")
-            menu = generate_fake_menu()
+            prepared = prefetcher.get()
+            menu = prepared.menu
             print("🍽️ Fake Menu:")
             print(menu)
 
@@ -111,18 +176,29 @@ def main():
                     day = int(input("Enter day (1-31): "))
                 except ValueError:
                     print("Invalid input: must enter integers.")
+                    prefetcher.close()
                     return
 
                 target = date(year, month, day)
                 meal = input("Enter meal (Lunch/Dinner): ").strip()
 
                 print(f"Starting scraper for {meal} on {target.isoformat()}...")
-                raw_menu_dict = menu_scraper(target_date=target, meal=meal)
+                from menu_backends import STATIONS, get_backend
+                if backend is None:
+                    backend = get_backend(MENU_BACKEND, cache=menu_cache)
+                raw_menu_dict = backend.fetch(target_date=target, meal=meal)
 
                 if raw_menu_dict:
                     print("🍽️ Raw Menu:")
                     print(raw_menu_dict)
-                    menu = process_menu_dict(raw_menu_dict)
+                    stations = list(raw_menu_dict)
+                    dishes = [d for station_dishes in raw_menu_dict.values() for d in station_dishes]
+                    tokens = menu_dish_tokens(raw_menu_dict)
+                    menu = menu_cache.get_processed(target, meal, stations)
+                    if menu is None:
+                        menu = process_menu_dict(raw_menu_dict)
+                        if all(st in raw_menu_dict for st in STATIONS):  # don't pin a partial menu
+                            menu_cache.put_processed(target, meal, stations, menu)
                     print("🍽️ Processed Menu:")
                     print(menu)
                     break
@@ -130,20 +206,28 @@ def main():
         # ==========================================================
         # LLM score (same for fake and real menus)
         # ==========================================================
-        s_llm, why = llama_score(menu, profile)
-        print(f"LLM score: {s_llm} | Rationale: {why}")
+        if prepared is not None:
+            s_llm, why, source = prepared.llm_score, prepared.rationale, prepared.llm_source
+        else:
+            if dishes and LLM_DISH_MODE:
+                res = llama_score_dishes(dishes, profile, menu_text=menu, tie_break=True, fallback=fallback)
+            else:
+                res = llama_score(menu, profile, structured=LLM_STRUCTURED, fallback=fallback)
+            (s_llm, why), source = res, res.source
+        llm_ok = source == "llm"
+        print(f"LLM score: {s_llm} | Rationale: {why}" + ("" if llm_ok else f" [{source}]"))
 
         # ==========================================================
         # Prediction logic
         # ==========================================================
         if learner.fitted:
-            pred = learner.predict(menu, s_llm)
+            pred = learner.predict(menu, s_llm, tokens)
             print(f"Hybrid prediction (model + LLM): {pred:.2f}")
 
         elif len(user_scores) >= MIN_ROWS_TO_TRAIN:
             learner.initial_fit(menus, llm_scores, user_scores)
             save_learner(learner)
-            pred = learner.predict(menu, s_llm)
+            pred = learner.predict(menu, s_llm, tokens)
             print(f"[Model initialized] Prediction: {pred:.2f}")
 
         else:
@@ -156,13 +240,15 @@ def main():
         while True:
             rating = input("Your rating for this advice (1–5, or 'q' to quit): ").strip()
 
-            if rating.lower() == "q" and learner.fitted:
-                print("Exiting. Saving model...")
-                save_learner(learner)
-                print("Model is saved.")
-                return
-            elif rating.lower() == "q":
-                print("Exiting directly. No model saved.")
+            if rating.lower() == "q":
+                prefetcher.close()
+                if learner.fitted:
+                    print("Exiting. Saving model...")
+                    learner.flush()
+                    save_learner(learner, wait=True)
+                    print("Model is saved.")
+                else:
+                    print("Exiting directly. No model saved.")
                 return
 
             try:
@@ -176,31 +262,50 @@ def main():
         # ==========================================================
         # Log data
         # ==========================================================
+        # A fallback score is not an LLM score: log it as NaN and don't train on it
+        log.append(menu, s_llm if llm_ok else float("nan"), r_int, prediction=pred, profile=profile)
+        if not llm_ok:
+            print("[Fallback] Rating logged without an LLM score; skipping model update.")
+            time.sleep(0.2)
+            continue
+
         menus.append(menu)
         llm_scores.append(s_llm)
         user_scores.append(float(r_int))
 
-        append_csv(CSV_PATH, {
-            "menu": menu, 
-            "llm_score": s_llm, 
-            "user_score": r_int
-        })
-
         # ==========================================================
         # Online update
         # ==========================================================
         if len(user_scores) >= MIN_ROWS_TO_TRAIN:
-            learner.update(menu, s_llm, float(r_int))
-            save_learner(learner)
-            print("Updated model metrics:", learner.metrics)
+            if learner.update(menu, s_llm, float(r_int), tokens):
+                save_learner(learner)
+                print("Updated model metrics:", learner.metrics)
+            else:
+                print(f"[Queued rating] {learner.pending}/{learner.batch_size} for next mini-batch")
 
         time.sleep(0.2)
 
+    prefetcher.close()
+    if learner.fitted:
+        learner.flush()
+        save_learner(learner, wait=True)
     print(f"Done with {ROUNDS} rounds")
     print("Model is saved.")
+    print("LLM score cache:", get_score_cache().stats())
 
+    from plot import plot_metrics
     plot_metrics(learner)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="MenuMind adaptive dining advisor")
+    parser.add_argument("--metrics", action="store_true", help="print saved model metrics and exit")
+    parser.add_argument("--score", metavar="MENU", help="score one menu text and exit")
+    args = parser.parse_args()
+
+    if args.metrics:
+        print_metrics()
+    elif args.score:
+        score_once(args.score)
+    else:
+        main()
@@ -0,0 +1,227 @@
+# menu_backends.py
+import json
+import re
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from menu_cache import LOCATION, MenuCache
+from tracing import span
+
+BASE_URL = "https://virginia.campusdish.com"
+LOCATION_PATH = "/en/locationsandmenus/observatoryhilldiningroom/"
+MENU_API = "/api/menu/GetMenus"
+HTTP_TIMEOUT = 15.0
+STATIONS = ["Hearth", "True Balance"]
+
+MenuKey = Tuple[date, str]
+
+
+# -------------------------------------
+# Backend interface
+# -------------------------------------
+class MenuBackend:
+    """
+    Fetch one menu as {station: [dish names]} (or dish dicts if detailed).
+    A station with no dishes that meal is []; one that failed to load is
+    left out of the dict.
+    """
+
+    name = "base"
+
+    def fetch(self, target_date: date, meal: str, stations: Optional[List[str]] = STATIONS,
+              detailed: bool = False) -> Optional[Dict[str, list]]:
+        raise NotImplementedError
+
+    def fetch_range(self, start: date, end: date, meals: List[str],
+                    stations: Optional[List[str]] = STATIONS,
+                    detailed: bool = False) -> Dict[MenuKey, Optional[Dict[str, list]]]:
+        """Every (date, meal) in [start, end]; None for keys that failed."""
+        out = {}
+        d = start
+        while d <= end:
+            for meal in meals:
+                out[(d, meal)] = self.fetch(d, meal, stations=stations, detailed=detailed)
+            d += timedelta(days=1)
+        return out
+
+    def close(self) -> None:
+        pass
+
+
+class SeleniumBackend(MenuBackend):
+    """Drives the CampusDish page in headless Chrome (see menu_scraper)."""
+
+    name = "selenium"
+
+    def __init__(self, url: Optional[str] = None, pool=None):
+        import menu_scraper  # Selenium is only loaded when this backend is used
+        self._scraper = menu_scraper
+        self.url = url or menu_scraper.URL
+        self.pool = pool
+
+    def fetch(self, target_date, meal, stations=STATIONS, detailed=False):
+        return self._scraper.menu_scraper(target_date=target_date, meal=meal, url=self.url,
+                                         pool=self.pool, stations=stations, detailed=detailed)
+
+    def fetch_range(self, start, end, meals, stations=STATIONS, detailed=False):
+        """One page load for the whole range (menu_scraper.scrape_range)."""
+        menus, errors = self._scraper.scrape_range(start, end, meals, stations=stations, url=self.url,
+                                                  pool=self.pool, detailed=detailed)
+        for (d, meal), reason in sorted(errors.items()):
+            print(f"[WARN] No menu for {meal} on {d.isoformat()}: {reason}")
+        return menus
+
+
+class HttpBackend(MenuBackend):
+    """
+    Calls the JSON endpoint the CampusDish frontend itself loads, over a
+    pooled keep-alive connection. No browser is started.
+    base_url can point at a local server replaying recorded responses.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url: str = BASE_URL, location_id: Optional[str] = None,
+                 maxsize: int = 4, timeout: float = HTTP_TIMEOUT):
+        import urllib3
+
+        self.base_url = base_url.rstrip("/")
+        self.location_id = location_id
+        self.http = urllib3.PoolManager(
+            maxsize=maxsize,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=urllib3.Retry(total=2, backoff_factor=0.2),
+            headers={"Accept": "application/json", "User-Agent": "MenuMind/1.0"},
+        )
+
+    def _get(self, path: str, fields: Optional[dict] = None):
+        resp = self.http.request("GET", self.base_url + path, fields=fields)
+        if resp.status != 200:
+            raise RuntimeError(f"HTTP {resp.status} for {path}")
+        return resp
+
+    def _location(self) -> str:
+        """Read the location id embedded in the O-Hill page (once)."""
+        if self.location_id is None:
+            html = self._get(LOCATION_PATH).data.decode("utf-8", "replace")
+            m = re.search(r'locationId["\']?\s*[:=]\s*["\']?(\d+)', html, re.IGNORECASE)
+            if not m:
+                raise RuntimeError("Could not find locationId on the location page.")
+            self.location_id = m.group(1)
+        return self.location_id
+
+    def _menu(self, target_date: date, period_id: str = "") -> dict:
+        fields = {
+            "locationId": self._location(),
+            "mode": "Daily",
+            "date": target_date.strftime("%m/%d/%Y"),
+            "periodId": period_id,
+        }
+        return json.loads(self._get(MENU_API, fields).data)["Menu"]
+
+    def fetch(self, target_date, meal, stations=STATIONS, detailed=False):
+        try:
+            menu = self._menu(target_date)
+            periods = {p["Name"].strip().lower(): str(p["PeriodId"]) for p in menu.get("MenuPeriods", [])}
+            period_id = periods.get(meal.strip().lower())
+            if period_id is None:
+                print(f"🚫 No {meal} on {target_date.isoformat()} (have: {sorted(periods)}).")
+                return None
+            menu = self._menu(target_date, period_id)
+        except Exception as e:
+            print(f"[WARN] HTTP menu fetch failed: {e}")
+            return None
+
+        names = {str(s["StationId"]): s["Name"].strip() for s in menu.get("MenuStations", [])}
+        found: Dict[str, list] = {name: [] for name in names.values()}
+        for item in menu.get("MenuProducts", []):
+            station = names.get(str(item.get("StationId")))
+            product = item.get("Product") or {}
+            dish = (product.get("MarketingName") or product.get("DisplayName") or "").strip()
+            if station is None or not dish:
+                continue
+            icons = [d["Name"] for d in product.get("DietaryInformation") or [] if d.get("Name")]
+            found[station].append({"name": dish, "icons": icons} if detailed else dish)
+
+        wanted = list(found) if stations is None else stations
+        return {st: found.get(st, []) for st in wanted}
+
+    def close(self) -> None:
+        self.http.clear()
+
+
+class CachedBackend(MenuBackend):
+    """
+    Checks the local MenuCache before delegating to another backend, so a
+    repeated (date, meal) never starts a browser or HTTP request.
+    Menus are cached in detailed form and reduced to names on the way out.
+    """
+
+    def __init__(self, backend: MenuBackend, cache: Optional[MenuCache] = None,
+                 location: str = LOCATION):
+        self.backend = backend
+        self.cache = cache or MenuCache()
+        self.location = location
+        self.name = f"cached-{backend.name}"
+
+    def fetch(self, target_date, meal, stations=STATIONS, detailed=False):
+        with span("scrape", backend=self.backend.name, cache_hit=False) as sp:
+            menu = self.cache.get(target_date, meal, stations, location=self.location)
+            if menu is not None:
+                sp["cache_hit"] = True
+                print(f"[Menu cache hit] {meal} on {target_date.isoformat()}")
+            else:
+                menu = self.backend.fetch(target_date, meal, stations=stations, detailed=True)
+                if not menu or not any(menu.values()):
+                    return menu
+                # Stations that failed to load are absent, so the next fetch
+                # misses and retries them; empty stations are cached as []
+                self.cache.put(target_date, meal, menu, location=self.location)
+            sp["size"] = sum(len(dishes) for dishes in menu.values())
+        if detailed:
+            return menu
+        return {st: [d["name"] for d in dishes] for st, dishes in menu.items()}
+
+    def fetch_range(self, start, end, meals, stations=STATIONS, detailed=False):
+        """Serve cached keys; scrape the span of missing ones in one backend call."""
+        out: Dict[MenuKey, Optional[Dict[str, list]]] = {}
+        missing: List[MenuKey] = []
+        d = start
+        while d <= end:
+            for meal in meals:
+                menu = self.cache.get(d, meal, stations, location=self.location)
+                out[(d, meal)] = menu
+                if menu is None:
+                    missing.append((d, meal))
+            d += timedelta(days=1)
+        print(f"[Menu cache] {len(out) - len(missing)}/{len(out)} menus cached")
+
+        if missing:
+            days = [k[0] for k in missing]
+            want = [m for m in meals if any(k[1] == m for k in missing)]
+            with span("scrape", backend=self.backend.name, size=len(missing)):
+                fetched = self.backend.fetch_range(min(days), max(days), want, stations=stations, detailed=True)
+            for key in missing:
+                menu = fetched.get(key)
+                out[key] = menu
+                if menu and any(menu.values()):
+                    self.cache.put(key[0], key[1], menu, location=self.location)
+        if detailed:
+            return out
+        return {k: None if m is None else {st: [d["name"] for d in dishes] for st, dishes in m.items()}
+                for k, m in out.items()}
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+BACKENDS = {SeleniumBackend.name: SeleniumBackend, HttpBackend.name: HttpBackend}
+
+
+def get_backend(name: str, cache: Optional[MenuCache] = None, **kwargs) -> MenuBackend:
+    """Build a backend by name; pass a MenuCache to put it in front."""
+    try:
+        backend = BACKENDS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown menu backend {name!r}; choose from {sorted(BACKENDS)}") from None
+    return CachedBackend(backend, cache) if cache is not None else backend
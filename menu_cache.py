@@ -0,0 +1,143 @@
+# menu_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional
+
+MENU_CACHE_PATH = "data/menu_cache.sqlite"
+MENU_TTL = 7 * 24 * 3600  # published menus rarely change; refresh weekly
+LOCATION = "observatoryhilldiningroom"
+
+
+class MenuCache:
+    """
+    Local cache of scraped menus keyed by (location, date, meal, station),
+    plus the processed menu text for a (location, date, meal, stations) set.
+    """
+
+    def __init__(self, path: str = MENU_CACHE_PATH, ttl: Optional[float] = MENU_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stations ("
+            " location TEXT, day TEXT, meal TEXT, station TEXT,"
+            " dishes TEXT NOT NULL, created REAL NOT NULL,"
+            " PRIMARY KEY (location, day, meal, station))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " location TEXT, day TEXT, meal TEXT, stations TEXT,"
+            " text TEXT NOT NULL, created REAL NOT NULL,"
+            " PRIMARY KEY (location, day, meal, stations))"
+        )
+        self._conn.commit()
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl if self.ttl is not None else float("-inf")
+
+    @staticmethod
+    def _norm(target: date, meal: str):
+        return target.isoformat(), meal.strip().lower()
+
+    # -----------------------------
+    # Raw station menus
+    # -----------------------------
+    def get(self, target: date, meal: str, stations: Optional[List[str]],
+            location: str = LOCATION) -> Optional[Dict[str, list]]:
+        """All requested stations must be fresh, otherwise it is a miss."""
+        day, meal = self._norm(target, meal)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT station, dishes FROM stations"
+                " WHERE location = ? AND day = ? AND meal = ? AND created >= ?",
+                (location, day, meal, self._cutoff()),
+            ).fetchall()
+        found = {station: json.loads(dishes) for station, dishes in rows}
+        wanted = sorted(found) if stations is None else stations
+        if not found or any(st not in found for st in wanted):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {st: found[st] for st in wanted}
+
+    def put(self, target: date, meal: str, menu: Dict[str, list], location: str = LOCATION) -> None:
+        day, meal = self._norm(target, meal)
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO stations VALUES (?, ?, ?, ?, ?, ?)",
+                [(location, day, meal, st, json.dumps(dishes, ensure_ascii=False), now)
+                 for st, dishes in menu.items()],
+            )
+            self._conn.commit()
+
+    # -----------------------------
+    # Processed menu text
+    # -----------------------------
+    def get_processed(self, target: date, meal: str, stations: List[str],
+                      location: str = LOCATION) -> Optional[str]:
+        day, meal = self._norm(target, meal)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM processed"
+                " WHERE location = ? AND day = ? AND meal = ? AND stations = ? AND created >= ?",
+                (location, day, meal, json.dumps(sorted(stations)), self._cutoff()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_processed(self, target: date, meal: str, stations: List[str], text: str,
+                      location: str = LOCATION) -> None:
+        day, meal = self._norm(target, meal)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?, ?)",
+                (location, day, meal, json.dumps(sorted(stations)), text, time.time()),
+            )
+            self._conn.commit()
+
+    # -----------------------------
+    # Invalidation
+    # -----------------------------
+    def invalidate(self, target: Optional[date] = None, meal: Optional[str] = None,
+                   location: Optional[str] = None) -> None:
+        """Drop entries matching every given field (no fields = everything)."""
+        clauses, args = [], []
+        if location is not None:
+            clauses.append("location = ?")
+            args.append(location)
+        if target is not None:
+            clauses.append("day = ?")
+            args.append(target.isoformat())
+        if meal is not None:
+            clauses.append("meal = ?")
+            args.append(meal.strip().lower())
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        with self._lock:
+            for table in ("stations", "processed"):
+                self._conn.execute(f"DELETE FROM {table}{where}", args)
+            self._conn.commit()
+
+    def purge_expired(self) -> None:
+        with self._lock:
+            for table in ("stations", "processed"):
+                self._conn.execute(f"DELETE FROM {table} WHERE created < ?", (self._cutoff(),))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __repr__(self):
+        return f"MenuCache(path={self.path!r}, hits={self.hits}, misses={self.misses})"
@@ -1,13 +1,167 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver import ActionChains
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 
-import time
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
 
 URL = "https://virginia.campusdish.com/en/locationsandmenus/observatoryhilldiningroom/"
+WAIT_TIMEOUT = 10.0     # upper bound for any single UI condition
+LAZY_LOAD_TIMEOUT = 3.0  # stations may legitimately have no cards
+POLL = 0.05
+
+STATION_CSS = "div[class*='MenuStation_no-categories']"
+CARD_CSS = "li[data-testid='product-card']"
+STATIONS = ["Hearth", "True Balance"]
+
+# One async round-trip: scroll stations into view, wait until the number of
+# product cards stops changing (lazy loading), then return every station's
+# dishes with their dietary icons.
+EXTRACT_JS = """
+const [stationCss, cardCss, timeoutMs, done] = arguments;
+const countCards = () => document.querySelectorAll(stationCss + ' ' + cardCss).length;
+const collect = () => Array.from(document.querySelectorAll(stationCss)).map(st => {
+    const h = st.querySelector('h2');
+    return {
+        station: h ? h.textContent.trim() : '',
+        dishes: Array.from(st.querySelectorAll(cardCss)).map(card => {
+            const n = card.querySelector("[data-testid='product-card-header-link']")
+                   || card.querySelector("[data-testid='product-card-header-title']");
+            const icons = new Set();
+            card.querySelectorAll('img[alt], img[title], [role=img][aria-label]').forEach(el => {
+                const label = (el.getAttribute('alt') || el.getAttribute('title')
+                               || el.getAttribute('aria-label') || '').trim();
+                if (label) icons.add(label);
+            });
+            return {name: n ? n.textContent.trim() : '', icons: Array.from(icons)};
+        }).filter(d => d.name)
+    };
+});
+document.querySelectorAll(stationCss).forEach(st => st.scrollIntoView({block: 'center'}));
+const t0 = Date.now();
+let last = -1, stable = 0;
+(function poll() {
+    const n = countCards();
+    stable = (n === last && n > 0) ? stable + 1 : 0;
+    last = n;
+    if (stable >= 2 || Date.now() - t0 > timeoutMs) { done(collect()); return; }
+    setTimeout(poll, 50);
+})();
+"""
+
+
+# -----------------------------
+# Driver pool
+# -----------------------------
+def _new_driver():
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1400,1000")
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(45)
+    return driver
+
+
+class DriverPool:
+    """
+    Keeps up to `size` headless Chrome sessions alive between scrapes.
+    Use `with pool.borrow() as driver:`; broken sessions are discarded.
+    """
+
+    def __init__(self, size: int = 1, factory=_new_driver):
+        self.size = size
+        self.factory = factory
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    @contextmanager
+    def borrow(self):
+        driver = self._acquire()
+        healthy = True
+        try:
+            yield driver
+        except Exception:
+            healthy = self._is_alive(driver)
+            raise
+        finally:
+            self._release(driver, healthy)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    def _release(self, driver, healthy: bool) -> None:
+        if healthy:
+            self._idle.put(driver)
+            return
+        with self._lock:
+            self._created -= 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_alive(driver) -> bool:
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def close(self) -> None:
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            with self._lock:
+                self._created -= 1
+
+
+_pool: Optional[DriverPool] = None
+
+
+def get_driver_pool() -> DriverPool:
+    """Process-wide pool; drivers are quit at interpreter exit."""
+    global _pool
+    if _pool is None:
+        _pool = DriverPool()
+        atexit.register(_pool.close)
+    return _pool
+
+
+def _wait(driver, timeout: float = WAIT_TIMEOUT) -> WebDriverWait:
+    return WebDriverWait(driver, timeout, poll_frequency=POLL)
+
 
 def _month_key(dt: datetime) -> int:
     return dt.year * 12 + dt.month
@@ -29,7 +183,8 @@ def _select_date_forward_only(driver, target: date) -> bool:
     date_btn = driver.find_element(By.CSS_SELECTOR, "button#aria-date-controller")
     driver.execute_script("arguments[0].click();", date_btn)
     print("Opened date picker.")
-    time.sleep(1)
+    _wait(driver).until(EC.presence_of_element_located(
+        (By.CSS_SELECTOR, ".react-datepicker__month[aria-label^='month']")))
 
     current = _get_visible_year_month(driver)
     t_month = datetime(target.year, target.month, 1)
@@ -45,7 +200,8 @@ def _select_date_forward_only(driver, target: date) -> bool:
             "button[aria-label='Next Month'].react-datepicker__navigation--next"
         )
         driver.execute_script("arguments[0].click();", next_btn)
-        time.sleep(1)
+        before = _month_key(current)
+        _wait(driver).until(lambda d: _month_key(_get_visible_year_month(d)) != before)
         current = _get_visible_year_month(driver)
 
     aria_label_exact = f"Choose {target.strftime('%A')}, {target.strftime('%B')} {_ordinal(target.day)}, {target.year}"
@@ -83,7 +239,8 @@ def _select_date_forward_only(driver, target: date) -> bool:
     # Otherwise, click it
     driver.execute_script("arguments[0].click();", day_el)
     print(f"✅ Selected {target.isoformat()}")
-    time.sleep(1)
+    _wait(driver).until(EC.presence_of_element_located(
+        (By.CSS_SELECTOR, "input#aria-meal-input[role='combobox']")))
     return True
 
 def _select_meal(driver, meal: str) -> bool:
@@ -106,7 +263,9 @@ def _select_meal(driver, meal: str) -> bool:
         driver.execute_script("arguments[0].scrollIntoView({block:'center'});", input_el)
     except Exception:
         pass
-    time.sleep(0.3)
+
+    def _expanded(_):
+        return (input_el.get_attribute("aria-expanded") or "").lower() == "true"
 
     # OPEN the dropdown
     for sel in selectors_to_try:
@@ -116,12 +275,10 @@ def _select_meal(driver, meal: str) -> bool:
                 el.click()
             except Exception:
                 driver.execute_script("arguments[0].click();", el)
-            time.sleep(0.4)
             try:
-                expanded = input_el.get_attribute("aria-expanded")
-                if expanded and expanded.lower() == "true":
-                    break
-            except Exception:
+                _wait(driver, 1.0).until(_expanded)
+                break
+            except TimeoutException:
                 pass
         except Exception:
             continue
@@ -129,9 +286,9 @@ def _select_meal(driver, meal: str) -> bool:
     # Type the meal and press Enter (React-Select filters options)
     try:
         input_el.send_keys(meal)
-        time.sleep(0.5) 
+        _wait(driver).until(EC.presence_of_element_located((By.CSS_SELECTOR, "[role='option']")))
         input_el.send_keys(Keys.ENTER)
-        time.sleep(0.8)
+        _wait(driver).until(lambda d: not _expanded(d))
     except Exception:
         print("🚫 Typing/selection failed in the meal dropdown.")
         return False
@@ -146,10 +303,14 @@ def scrape_station(driver, station_name):
             f"//div[contains(@class,'MenuStation_no-categories') and .//h2[normalize-space()='{station_name}']]"
         )
         driver.execute_script("arguments[0].scrollIntoView({block:'center'});", station)
-        time.sleep(0.8)  # allow lazy loading
+        try:
+            # allow lazy loading
+            _wait(driver, LAZY_LOAD_TIMEOUT).until(lambda _: station.find_elements(By.CSS_SELECTOR, CARD_CSS))
+        except TimeoutException:
+            pass
 
         menu = []
-        cards = station.find_elements(By.CSS_SELECTOR, "li[data-testid='product-card']")
+        cards = station.find_elements(By.CSS_SELECTOR, CARD_CSS)
         for card in cards:
             name_els = card.find_elements(By.CSS_SELECTOR, "[data-testid='product-card-header-link']")
             if not name_els:
@@ -160,61 +321,162 @@ def scrape_station(driver, station_name):
         return menu
 
 
-def menu_scraper(target_date: date, meal: str):
+def _open_change_dialog(driver) -> None:
+    change_btn = _wait(driver).until(EC.presence_of_element_located(
+        (By.CSS_SELECTOR, "button.DateMealFilterButton")))
+    driver.execute_script("arguments[0].click();", change_btn)
+    print("Opened Change dialog.")
+    _wait(driver).until(EC.presence_of_element_located(
+        (By.CSS_SELECTOR, "button#aria-date-controller")))
+
+
+def _click_done(driver) -> bool:
+    try:
+        btn = driver.find_element(By.XPATH, "//button[.//span[normalize-space()='Done']]")
+        driver.execute_script("arguments[0].click();", btn)
+        print("✅ Clicked Done.")
+        _wait(driver).until(EC.invisibility_of_element(btn))
+        _wait(driver).until(EC.presence_of_element_located((By.CSS_SELECTOR, STATION_CSS)))
+        return True
+    except Exception:
+        print("⚠️ Done button not found.")
+        return False
+
+
+def extract_menu(driver, timeout: float = LAZY_LOAD_TIMEOUT) -> Dict[str, List[dict]]:
     """
-    Launches Selenium, opens the CampusDish O-Hill page,
-    clicks 'Change', then selects the given target_date (forward-only).
-    Extend this function to select meal & scrape items afterward.
+    Pull every station and dish in a single execute_async_script call.
+    Returns {station: [{"name": ..., "icons": [...]}, ...]}.
     """
-    options = Options()
-    options.add_argument("--headless=new")
-    options.add_argument("--window-size=1400,1000")
+    driver.set_script_timeout(timeout + WAIT_TIMEOUT)
+    rows = driver.execute_async_script(EXTRACT_JS, STATION_CSS, CARD_CSS, int(timeout * 1000))
+    return {row["station"]: row["dishes"] for row in rows if row["station"]}
 
-    driver = webdriver.Chrome(options=options)
-    driver.set_page_load_timeout(45)
 
-    try:
-        # Open page
-        driver.get(URL)
-        time.sleep(1.5)
-
-        # Click "Change" to open dialog
-        change_btn = driver.find_element(By.CSS_SELECTOR, "button.DateMealFilterButton")
-        driver.execute_script("arguments[0].click();", change_btn)
-        print("Opened Change dialog.")
-        time.sleep(1)
-
-        # Enforce forward-only policy
-        if target_date < date.today():
-            print(f"Target date {target_date} is before today. Aborting per forward-only policy.")
-            return
+def _scrape_stations(driver, stations: Optional[List[str]], detailed: bool = False,
+                     single_pass: bool = True) -> Dict[str, list]:
+    """
+    Scrape `stations` (None = every station on the page). single_pass uses
+    extract_menu; otherwise falls back to per-card WebDriver lookups.
+    With detailed=True dishes are dicts with name and dietary icons.
+    A station that failed to load is left out; one the loaded page shows
+    without dishes (or doesn't show) is [].
+    """
+    if single_pass:
+        try:
+            found = extract_menu(driver)
+            if not any(found.values()):
+                # No card anywhere: the lazy load timed out, nothing is known
+                print("[WARN] No dishes loaded on the page.")
+                return {}
+            wanted = list(found) if stations is None else stations
+            return {
+                st: [d if detailed else d["name"] for d in found.get(st, [])]
+                for st in wanted
+            }
+        except Exception as e:
+            print(f"[WARN] Single-pass extraction failed, using per-card lookups: {e}")
+    if stations is None:
+        stations = STATIONS
+
+    menu = {}
+    for station in stations:
+        try:
+            names = scrape_station(driver, station)
+            menu[station] = [{"name": n, "icons": []} for n in names] if detailed else names
+        except Exception as e:
+            print(f"Could not scrape {station}: {e}")
+    return menu
+
+
+def menu_scraper(target_date: date, meal: str, url: str = URL, pool: Optional[DriverPool] = None,
+                 stations: Optional[List[str]] = STATIONS, detailed: bool = False):
+    """
+    Borrows a Chrome session from the pool, opens the CampusDish O-Hill page
+    (or `url`, e.g. a file:// copy for offline testing), clicks 'Change',
+    selects the given target_date (forward-only) and meal, then scrapes items.
+    stations=None scrapes every station; detailed=True adds dish metadata.
+    """
+    # Enforce forward-only policy (before spending a browser session)
+    if target_date < date.today():
+        print(f"Target date {target_date} is before today. Aborting per forward-only policy.")
+        return
+
+    with (pool or get_driver_pool()).borrow() as driver:
+        driver.get(url)
+        _open_change_dialog(driver)
 
         if not _select_date_forward_only(driver, target_date):
             return
-        
+
         if not _select_meal(driver, meal):
             return
-        
-        # Click "Done" button to update the menu
-        try:
-            btn = driver.find_element(By.XPATH, "//button[.//span[normalize-space()='Done']]")
-            driver.execute_script("arguments[0].click();", btn)
-            print("✅ Clicked Done.")
-            time.sleep(4.0)
-        except Exception:
-            print("⚠️ Done button not found.")
+
+        if not _click_done(driver):
             return
-        
-        # Scrape the menu from Hearth, True Balance, and Meze
-        menu = {}
-        for station in ["Hearth", "True Balance"]:
-            try:
-                menu[station] = scrape_station(driver, station)
-            except Exception as e:
-                print(f"Could not scrape {station}: {e}")
-                menu[station] = []
-        return menu
-    
-    finally:
-        driver.quit()
 
+        return _scrape_stations(driver, stations, detailed=detailed)
+
+
+# -----------------------------
+# Bulk scraping
+# -----------------------------
+def scrape_range(start: date, end: date, meals: List[str], stations: Optional[List[str]] = STATIONS,
+                 url: str = URL, pool: Optional[DriverPool] = None, detailed: bool = False
+                 ) -> Tuple[Dict[Tuple[date, str], Optional[Dict[str, list]]],
+                            Dict[Tuple[date, str], str]]:
+    """
+    Scrape every (date, meal) in [start, end] with one page load: the date
+    picker only ever moves forward, and meals are switched in place.
+
+    Returns (menus, errors): menus maps (date, meal) -> {station: [dishes]}
+    or None for keys that failed; errors maps failed keys -> reason.
+    """
+    menus: Dict[Tuple[date, str], Optional[Dict[str, list]]] = {}
+    errors: Dict[Tuple[date, str], str] = {}
+
+    def _fail(d: date, reason: str, only: Optional[str] = None) -> None:
+        for m in ([only] if only else meals):
+            menus[(d, m)] = None
+            errors[(d, m)] = reason
+
+    first = max(start, date.today())
+    for d in _date_range(start, min(first, end + timedelta(days=1)) - timedelta(days=1)):
+        _fail(d, "before today (forward-only policy)")
+    if first > end:
+        return menus, errors
+
+    with (pool or get_driver_pool()).borrow() as driver:
+        driver.get(url)
+        for d in _date_range(first, end):
+            date_ok = False
+            for meal in meals:
+                try:
+                    _open_change_dialog(driver)
+                    if not date_ok:
+                        if not _select_date_forward_only(driver, d):
+                            _fail(d, "date unavailable")
+                            # Close the dialog so the next date starts clean
+                            _click_done(driver)
+                            break
+                        date_ok = True
+                    if not _select_meal(driver, meal):
+                        _fail(d, "meal selection failed", only=meal)
+                        _click_done(driver)
+                        continue
+                    if not _click_done(driver):
+                        _fail(d, "menu did not load", only=meal)
+                        continue
+                    menus[(d, meal)] = _scrape_stations(driver, stations, detailed=detailed)
+                except Exception as e:
+                    print(f"[WARN] Scrape failed for {meal} on {d.isoformat()}: {e}")
+                    _fail(d, f"error: {e}", only=meal)
+
+    return menus, errors
+
+
+def _date_range(start: date, end: date):
+    d = start
+    while d <= end:
+        yield d
+        d += timedelta(days=1)
@@ -0,0 +1,53 @@
+# menu_text.py
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from tracing import span
+
+STOP_WORDS = frozenset({'and', 'with', 'a', 'the', 'of', 'in', 'for', 'is', 'on', 'or', 'just'})
+MIN_WORD_LEN = 3
+TOKEN_CACHE_SIZE = 8192   # dishes recur across days, so this stays hot
+
+_WORD_RE = re.compile(r'\b\w+\b')
+# HashingVectorizer's default analyzer (lowercase + token_pattern), for free text
+_VECTORIZER_TOKEN_RE = re.compile(r'(?u)\b\w\w+\b')
+
+
+# -----------------------------
+# Tokenization (cached per string)
+# -----------------------------
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def dish_tokens(dish: str) -> Tuple[str, ...]:
+    """Lowercased words of one dish name, minus stop words and short words."""
+    return tuple(word for word in _WORD_RE.findall(dish.lower())
+                 if word not in STOP_WORDS and len(word) >= MIN_WORD_LEN)
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def text_tokens(text: str) -> Tuple[str, ...]:
+    """Tokens exactly as the learner's HashingVectorizer would see them."""
+    return tuple(_VECTORIZER_TOKEN_RE.findall(text.lower()))
+
+
+def menu_dish_tokens(menu_dict: Dict[str, List[str]]) -> List[Tuple[str, ...]]:
+    """
+    Per-dish token tuples in menu order. Pass these to Learner.predict /
+    update (tokens=...) so a new menu built from known dishes is neither
+    re-tokenized nor re-hashed.
+    """
+    return [dish_tokens(text_item) for dishes_list in menu_dict.values() for text_item in dishes_list]
+
+
+def menu_tokens(menu_dict: Dict[str, List[str]]) -> List[str]:
+    return [token for tokens in menu_dish_tokens(menu_dict) for token in tokens]
+
+
+# -----------------------------
+# Menu processing
+# -----------------------------
+def process_menu_dict(menu_dict):
+    with span("process_menu") as sp:
+        text = " ".join(menu_tokens(menu_dict))
+        sp["size"] = len(text)
+    return text
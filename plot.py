@@ -18,8 +18,11 @@ def plot_metrics(learner, save_dir="plots"):
 
     # create plot
     plt.figure(figsize=(10, 6))
-    plt.plot(learner.metrics.history_n, learner.metrics.history_mae, label="MAE")
-    plt.plot(learner.metrics.history_n, learner.metrics.history_rmse, label="RMSE")
+    history = learner.metrics.history()
+    plt.plot(history["n"], history["mae"], label="MAE")
+    plt.plot(history["n"], history["rmse"], label="RMSE")
+    plt.plot(history["n"], history["window_mae"], "--", label=f"MAE (last {learner.metrics.window})")
+    plt.plot(history["n"], history["window_rmse"], "--", label=f"RMSE (last {learner.metrics.window})")
     ax = plt.gca()
     ax.xaxis.set_major_locator(ticker.MaxNLocator(integer=True))
     plt.xlabel("Number of Samples Seen")
@@ -0,0 +1,148 @@
+# prefetch.py
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+PREFETCH_DEPTH = 3     # menus prepared ahead of the current round
+PREFETCH_WORKERS = 2
+
+_DONE = object()
+
+
+@dataclass
+class PreparedMenu:
+    menu: str
+    llm_score: int
+    rationale: str
+    dishes: Optional[List[str]] = None
+    meta: dict = field(default_factory=dict)
+    llm_source: str = "llm"   # see llm.LLMScore.source
+
+
+# -----------------------------
+# Menu sources
+# -----------------------------
+def synthetic_source(count: int, generate: Callable[[], str]) -> Iterator[Tuple[str, None, dict]]:
+    for _ in range(count):
+        yield generate(), None, {"source": "synthetic"}
+
+
+# -----------------------------
+# Prefetcher
+# -----------------------------
+class Prefetcher:
+    """
+    Pulls menus from `source` on a background thread and scores them on a
+    small worker pool, keeping at most `depth` prepared menus queued (in
+    source order). get() hands out the next one; close() cancels pending
+    work so quitting never waits on an LLM call.
+    score_fn(menu, dishes, cancel) -> (score, rationale), where `cancel`
+    is a threading.Event set by close() that a running call should honour.
+    Workers are daemon threads, so a call that ignores it can't hold up exit.
+    """
+
+    def __init__(self, source: Iterable[Tuple[str, Optional[List[str]], dict]],
+                 score_fn: Callable[[str, Optional[List[str]], threading.Event], Tuple[int, str]],
+                 depth: int = PREFETCH_DEPTH, workers: int = PREFETCH_WORKERS):
+        self._source = source
+        self._score_fn = score_fn
+        self._queue: "queue.Queue" = queue.Queue(maxsize=depth)
+        self._work: "queue.Queue" = queue.Queue()
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._workers = [threading.Thread(target=self._work_loop, name=f"prefetch-{i}", daemon=True)
+                         for i in range(workers)]
+        for t in self._workers:
+            t.start()
+        self._thread = threading.Thread(target=self._produce, name="prefetch-producer", daemon=True)
+        self._thread.start()
+
+    def _submit(self, menu: str, dishes: Optional[List[str]]) -> Future:
+        fut: Future = Future()
+        self._work.put((fut, menu, dishes))
+        return fut
+
+    def _work_loop(self) -> None:
+        while True:
+            item = self._work.get()
+            if item is None:
+                return
+            fut, menu, dishes = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(self._score_fn(menu, dishes, self._stop))
+            except BaseException as e:
+                fut.set_exception(e)
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self) -> None:
+        try:
+            for menu, dishes, meta in self._source:
+                if self._stop.is_set():
+                    break
+                fut = self._submit(menu, dishes)
+                if not self._put((menu, dishes, meta, fut)):
+                    fut.cancel()
+                    break
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(_DONE)
+
+    def get(self) -> Optional[PreparedMenu]:
+        """Next prepared menu, or None once the source is exhausted."""
+        item = self._queue.get()
+        if item is _DONE:
+            self._queue.put(_DONE)  # stay exhausted for later callers
+            if self._error is not None:
+                raise self._error
+            return None
+        menu, dishes, meta, fut = item
+        res = fut.result()
+        score, why = res
+        return PreparedMenu(menu=menu, llm_score=score, rationale=why, dishes=dishes, meta=meta,
+                            llm_source=getattr(res, "source", "llm"))
+
+    def __iter__(self) -> Iterator[PreparedMenu]:
+        while True:
+            item = self.get()
+            if item is None:
+                return
+            yield item
+
+    def close(self) -> None:
+        self._stop.set()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _DONE and isinstance(item[3], Future):
+                item[3].cancel()
+        while True:
+            try:
+                item = self._work.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[0].cancel()
+        for _ in self._workers:
+            self._work.put(None)
+        self._thread.join(timeout=1.0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
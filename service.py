@@ -0,0 +1,339 @@
+# service.py
+"""
+Multi-user scoring service (asyncio, stdlib HTTP).
+
+    POST /profile   {"user_id", "profile"}
+    POST /score     {"user_id", "menu" | "menu_dict", ["llm_score"]}
+    POST /feedback  {"user_id", "menu" | "menu_dict", "llm_score", "user_score", ["prediction"], ["llm_source"]}
+
+Each user lives in users/<user_id>/ (profile.json + learner.npz). Hot
+learners are kept in a bounded LRU; evicted and dirty ones are
+checkpointed. LLM calls and model updates run in a thread pool so the
+event loop only parses requests.
+
+    python service.py [--host 127.0.0.1] [--port 8080]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from checkpoint import load_checkpoint, save_checkpoint
+from interaction_log import InteractionLog
+from menu_text import menu_dish_tokens, process_menu_dict
+from supervised_model import Learner, build_learner
+
+USERS_DIR = "users"
+SERVICE_LOG_PATH = "data/service_interactions"
+MAX_HOT_LEARNERS = 64
+CHECKPOINT_INTERVAL = 30.0   # seconds between checkpoints of dirty learners
+WORKERS = 4
+MAX_BODY = 1 << 20
+
+_USER_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class UserState:
+    def __init__(self, profile: dict, learner: Learner):
+        self.profile = profile
+        self.learner = learner
+        self.lock = asyncio.Lock()
+        self.dirty = False
+
+
+def _default_score_fn(menu: str, profile: dict) -> Tuple[int, str]:
+    from llm import llama_score  # ollama is only needed when no stub is given
+    return llama_score(menu, profile)
+
+
+def _model_estimate(learner: Learner, menu: str):
+    from llm import fallback_score, model_fallback
+    return fallback_score(menu, model_fallback(learner), "LLM unavailable")
+
+
+# -------------------------------------
+# Service
+# -------------------------------------
+class ScoringService:
+    def __init__(self, users_dir: str = USERS_DIR, capacity: int = MAX_HOT_LEARNERS,
+                 score_fn: Callable[[str, dict], Tuple[int, str]] = _default_score_fn,
+                 log: Optional[InteractionLog] = None, workers: int = WORKERS):
+        self.users_dir = users_dir
+        self.capacity = capacity
+        self.score_fn = score_fn
+        self.log = log if log is not None else InteractionLog(SERVICE_LOG_PATH)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="menumind")
+        self._hot: "OrderedDict[str, UserState]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._saving: Dict[str, asyncio.Future] = {}
+
+    def _paths(self, user_id: str) -> Tuple[str, str]:
+        if not _USER_ID_RE.match(user_id or ""):
+            raise HTTPError(400, "invalid user_id")
+        d = os.path.join(self.users_dir, user_id)
+        return os.path.join(d, "profile.json"), os.path.join(d, "learner.npz")
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    # -----------------------------
+    # LRU of hot learners
+    # -----------------------------
+    async def _user(self, user_id: str) -> UserState:
+        state = self._hot.get(user_id)
+        if state is not None:
+            self._hot.move_to_end(user_id)
+            return state
+        if user_id in self._loading:
+            return await self._loading[user_id]
+
+        fut = asyncio.get_running_loop().create_future()
+        self._loading[user_id] = fut
+        try:
+            if user_id in self._saving:  # don't read a checkpoint mid-eviction
+                await self._saving[user_id]
+            state = await self._run(self._load, user_id)
+            self._hot[user_id] = state
+            fut.set_result(state)
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._loading[user_id]
+
+        while len(self._hot) > self.capacity:
+            old_id, old = self._hot.popitem(last=False)
+            self._saving[old_id] = asyncio.ensure_future(self._evict(old_id, old))
+        return state
+
+    def _load(self, user_id: str) -> UserState:
+        profile_path, model_path = self._paths(user_id)
+        if not os.path.exists(profile_path):
+            raise HTTPError(404, f"no profile for user {user_id!r}")
+        with open(profile_path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+        learner = load_checkpoint(model_path) if os.path.exists(model_path) else build_learner()
+        return UserState(profile, learner)
+
+    async def _checkpoint(self, user_id: str, state: UserState) -> None:
+        async with state.lock:
+            if not state.dirty:
+                return
+            _, model_path = self._paths(user_id)
+            await self._run(save_checkpoint, state.learner, model_path)
+            state.dirty = False
+
+    async def _evict(self, user_id: str, state: UserState) -> None:
+        try:
+            await self._checkpoint(user_id, state)
+        finally:
+            self._saving.pop(user_id, None)
+
+    async def checkpoint_loop(self, interval: float = CHECKPOINT_INTERVAL) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            for user_id, state in list(self._hot.items()):
+                await self._checkpoint(user_id, state)
+            self.log.sync()
+
+    async def close(self) -> None:
+        for user_id, state in list(self._hot.items()):
+            await self._checkpoint(user_id, state)
+        if self._saving:
+            await asyncio.gather(*self._saving.values(), return_exceptions=True)
+        self.log.close()
+        self.executor.shutdown(wait=True)
+
+    # -----------------------------
+    # Endpoints
+    # -----------------------------
+    async def set_profile(self, body: dict) -> dict:
+        user_id = body.get("user_id")
+        profile = body.get("profile")
+        if not isinstance(profile, dict):
+            raise HTTPError(400, "profile must be an object")
+        profile_path, _ = self._paths(user_id)
+
+        def _write():
+            os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+            tmp = profile_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(profile, f, ensure_ascii=False, indent=4)
+            os.replace(tmp, profile_path)
+
+        await self._run(_write)
+        state = self._hot.get(user_id)
+        if state is not None:
+            state.profile = profile
+        return {"user_id": user_id, "ok": True}
+
+    @staticmethod
+    def _menu(body: dict):
+        """(menu text, per-dish tokens or None) from a request body."""
+        if isinstance(body.get("menu"), str):
+            return body["menu"], None
+        if isinstance(body.get("menu_dict"), dict):
+            return process_menu_dict(body["menu_dict"]), menu_dish_tokens(body["menu_dict"])
+        raise HTTPError(400, "menu or menu_dict is required")
+
+    async def score(self, body: dict) -> dict:
+        state = await self._user(body.get("user_id"))
+        menu, tokens = self._menu(body)
+        source = "llm"
+        if body.get("llm_score") is not None:
+            try:
+                s_llm, why = int(body["llm_score"]), None
+            except (TypeError, ValueError):
+                raise HTTPError(400, "llm_score must be an integer") from None
+        else:
+            res = await self._run(self.score_fn, menu, state.profile)
+            (s_llm, why), source = res, getattr(res, "source", "llm")
+        async with state.lock:
+            if source != "llm" and state.learner.fitted:
+                res = await self._run(_model_estimate, state.learner, menu)
+                (s_llm, why), source = res, res.source
+            pred = await self._run(state.learner.predict, menu, s_llm, tokens)
+        return {"user_id": body["user_id"], "menu": menu, "llm_score": s_llm, "llm_source": source,
+                "rationale": why, "prediction": pred, "fitted": state.learner.fitted}
+
+    async def feedback(self, body: dict) -> dict:
+        state = await self._user(body.get("user_id"))
+        menu, tokens = self._menu(body)
+        try:
+            s_llm = int(body["llm_score"])
+            rating = float(body["user_score"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "llm_score and user_score are required numbers") from None
+        if not 1 <= rating <= 5:
+            raise HTTPError(400, "user_score must be in 1–5")
+        try:
+            prediction = float(body["prediction"]) if body.get("prediction") is not None else float("nan")
+        except (TypeError, ValueError):
+            raise HTTPError(400, "prediction must be a number") from None
+
+        # Scores that came from a fallback (see /score's llm_source) are not trained on
+        llm_ok = body.get("llm_source", "llm") == "llm"
+        trained = False
+        if llm_ok:
+            async with state.lock:
+                trained = await self._run(state.learner.update, menu, s_llm, rating, tokens)
+                state.dirty = True
+        self.log.append(menu, s_llm if llm_ok else float("nan"), rating,
+                        prediction=prediction, profile=state.profile)
+        return {"user_id": body["user_id"], "trained": trained,
+                "pending": state.learner.pending, "metrics": repr(state.learner.metrics)}
+
+
+# -------------------------------------
+# Minimal HTTP/1.1 front end
+# -------------------------------------
+async def _read_request(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "bad request line") from None
+    headers = {}
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        k, _, v = h.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    length = int(headers.get("content-length", 0) or 0)
+    if length > MAX_BODY:
+        raise HTTPError(413, "body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path.split("?", 1)[0], headers, body
+
+
+def _response(status: int, payload: dict, keep_alive: bool) -> bytes:
+    reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + data
+
+
+def make_handler(service: ScoringService):
+    routes = {"/score": service.score, "/feedback": service.feedback, "/profile": service.set_profile}
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    req = await _read_request(reader)
+                    if req is None:
+                        break
+                    method, path, headers, body = req
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    if path == "/health":
+                        status, payload = 200, {"ok": True, "hot_learners": len(service._hot)}
+                    elif path not in routes:
+                        raise HTTPError(404, f"no route {path}")
+                    elif method != "POST":
+                        raise HTTPError(405, "use POST")
+                    else:
+                        try:
+                            data = json.loads(body or b"{}")
+                        except json.JSONDecodeError:
+                            raise HTTPError(400, "body must be JSON") from None
+                        if not isinstance(data, dict):
+                            raise HTTPError(400, "body must be a JSON object")
+                        status, payload = 200, await routes[path](data)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    print(f"[WARN] Request failed: {e}")
+                    status, payload = 500, {"error": "internal error"}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8080, service: Optional[ScoringService] = None) -> None:
+    service = service or ScoringService()
+    server = await asyncio.start_server(make_handler(service), host, port)
+    saver = asyncio.ensure_future(service.checkpoint_loop())
+    print(f"MenuMind service listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        saver.cancel()
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MenuMind multi-user scoring service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
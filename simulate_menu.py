@@ -6,7 +6,143 @@ FAKE_WORDS = [
     "beans", "rice", "broccoli", "steamed", "garlic", "herb",
     "pepper", "ginger", "sesame", "curry", "bbq"
 ]
+MEAT_WORDS = {"chicken", "turkey", "beef", "bbq", "pork", "ham", "bacon", "sausage", "fish", "shrimp"}
+VEG_PROTEIN_WORDS = {"tofu", "beans", "lentils", "chickpeas", "tempeh"}
+
+SEED = 42
+BATCH_SIZE = 100_000
+DENSE_VOCAB_FACTOR = 4   # vocabularies up to 4 * k_max words use the sort-keys sampler
 
 def generate_fake_menu():
     k = random.randint(6, 12)
     return " ".join(random.sample(FAKE_WORDS, k))
+
+
+# -------------------------------------
+# Vectorized generator for load tests
+# -------------------------------------
+def generate_menu_indices(n, rng, vocab_size, k_min=6, k_max=12):
+    """
+    n menus as a (n, k_max) matrix of distinct vocabulary indices plus a
+    length per row; row i uses its first lengths[i] columns. Memory is
+    O(n * k_max) whatever the vocabulary size: rows are drawn with
+    rng.integers and rows with a repeated word are redrawn (rejection
+    keeps each row a uniform ordered sample). Small vocabularies, where
+    repeats are common, sort random keys instead; that is O(n * V) but
+    V <= DENSE_VOCAB_FACTOR * k_max there.
+    """
+    import numpy as np
+
+    k_max = min(k_max, vocab_size)
+    k_min = min(k_min, k_max)
+    if vocab_size <= DENSE_VOCAB_FACTOR * k_max:
+        keys = rng.random((n, vocab_size), dtype=np.float32)
+        idx = np.argsort(keys, axis=1)[:, :k_max].astype(np.int32)
+    else:
+        idx = rng.integers(0, vocab_size, size=(n, k_max), dtype=np.int32)
+        while True:
+            s = np.sort(idx, axis=1)
+            redo = np.flatnonzero((s[:, 1:] == s[:, :-1]).any(axis=1))
+            if len(redo) == 0:
+                break
+            idx[redo] = rng.integers(0, vocab_size, size=(len(redo), k_max), dtype=np.int32)
+    lengths = rng.integers(k_min, k_max + 1, size=n)
+    return idx, lengths
+
+
+class SimulatedRater:
+    """
+    Parametric user driven by profile.json: each vocabulary word has a
+    weight (favorite foods up, meat down for vegetarians, plant proteins
+    up). A menu's rating is bias + sum(word weights) / sqrt(length) plus
+    Gaussian noise, rounded and clipped to 1–5. The simulated LLM score
+    is a noisier view of the same signal.
+    """
+
+    def __init__(self, profile, vocab=FAKE_WORDS, bias=3.0, fav_weight=1.5, meat_penalty=2.0,
+                 veg_bonus=0.75, noise=0.5, llm_noise=0.8):
+        import numpy as np
+
+        self.vocab = list(vocab)
+        favorites = {w.lower() for w in profile.get("favorite_food", [])}
+        w = np.zeros(len(self.vocab))
+        for i, word in enumerate(self.vocab):
+            if word in favorites:
+                w[i] += fav_weight
+            if profile.get("is_vegetarian") and word in MEAT_WORDS:
+                w[i] -= meat_penalty
+            if profile.get("is_vegetarian") and word in VEG_PROTEIN_WORDS:
+                w[i] += veg_bonus
+        self.weights = w
+        self.bias = bias
+        self.noise = noise
+        self.llm_noise = llm_noise
+
+    def rate(self, idx, lengths, rng):
+        """Return (llm_scores, user_scores) as int arrays for an index batch."""
+        import numpy as np
+
+        mask = np.arange(idx.shape[1]) < lengths[:, None]
+        signal = np.where(mask, self.weights[idx], 0.0).sum(axis=1) / np.sqrt(lengths)
+        true = self.bias + signal
+        user = np.clip(np.rint(true + rng.normal(0, self.noise, len(true))), 1, 5).astype(int)
+        llm = np.clip(np.rint(true + rng.normal(0, self.llm_noise, len(true))), 1, 5).astype(int)
+        return llm, user
+
+
+def iter_synthetic(n, profile, vocab=FAKE_WORDS, seed=SEED, batch_size=BATCH_SIZE, k_min=6, k_max=12):
+    """
+    Yield (menus, llm_scores, user_scores) batches for n reproducible
+    menus. The same (seed, batch_size) always yields the same data.
+    """
+    import numpy as np
+
+    vocab_arr = np.array(vocab, dtype=object)
+    rater = SimulatedRater(profile, vocab)
+    for b, start in enumerate(range(0, n, batch_size)):
+        rng = np.random.default_rng([seed, b])
+        m = min(batch_size, n - start)
+        idx, lengths = generate_menu_indices(m, rng, len(vocab), k_min, k_max)
+        llm, user = rater.rate(idx, lengths, rng)
+        words = vocab_arr[idx]
+        menus = [" ".join(row[:k]) for row, k in zip(words.tolist(), lengths.tolist())]
+        yield menus, llm, user
+
+
+def write_synthetic_log(path, n, profile, vocab=FAKE_WORDS, seed=SEED, batch_size=BATCH_SIZE):
+    """Stream n simulated interactions into an InteractionLog at `path`."""
+    from interaction_log import InteractionLog
+
+    written = 0
+    with InteractionLog(path) as log:
+        for menus, llm, user in iter_synthetic(n, profile, vocab, seed, batch_size):
+            log.append_many(menus, llm, user, profile=profile)
+            written += len(menus)
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description="Generate simulated menus and ratings")
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--profile", default="profile.json")
+    parser.add_argument("--vocab", help="file with one word per line (default: FAKE_WORDS)")
+    parser.add_argument("--out", default="data/sim_interactions", help="interaction log path")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    with open(args.profile, "r", encoding="utf-8") as f:
+        profile = json.load(f)
+    vocab = FAKE_WORDS
+    if args.vocab:
+        with open(args.vocab, "r", encoding="utf-8") as f:
+            vocab = [w.strip().lower() for w in f if w.strip()]
+
+    t0 = time.perf_counter()
+    count = write_synthetic_log(args.out, args.n, profile, vocab, args.seed, args.batch_size)
+    secs = time.perf_counter() - t0
+    print(f"Wrote {count} interactions to {args.out} in {secs:.1f}s ({count / secs:,.0f} rows/s)")
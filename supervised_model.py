@@ -1,27 +1,72 @@
 # supervised_model.py
-from typing import List
-from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
+from collections import deque
+from functools import lru_cache
 import numpy as np
 import math
+import scipy.sparse as sp
 
-from sklearn.feature_extraction.text import HashingVectorizer
-from sklearn.linear_model import SGDRegressor
+from menu_text import TOKEN_CACHE_SIZE, text_tokens
+from tracing import span
+
+if TYPE_CHECKING:  # scikit-learn is imported lazily in build_learner
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDRegressor
+
+DishTokens = Optional[Sequence[Tuple[str, ...]]]
 
 SEED = 42
+N_FEATURES = 1024
+HASH_CACHE_SIZE = 65536
+
+
+# -------------------------------------
+# Token hashing, identical to HashingVectorizer(alternate_sign=False)
+# -------------------------------------
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def token_index(token: str, n_features: int) -> int:
+    from sklearn.utils import murmurhash3_32
+
+    h = murmurhash3_32(token, seed=0)
+    if h == -2147483648:  # abs(-2**31) overflows int32; mirror sklearn's special case
+        return (2147483647 - (n_features - 1)) % n_features
+    return abs(h) % n_features
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def token_indices(tokens: Tuple[str, ...], n_features: int) -> np.ndarray:
+    """Hashed column of every token (cached per token tuple, read-only)."""
+    idx = np.fromiter((token_index(t, n_features) for t in tokens), dtype=np.int32, count=len(tokens))
+    idx.flags.writeable = False
+    return idx
 
 
 # -------------------------------------
 # Metrics tracking: MAE / RMSE / count
 # -------------------------------------
 class Metrics:
-    def __init__(self):
+    """
+    Cumulative MAE/RMSE plus a sliding window over the last `window` errors.
+    History is kept in a fixed-size array: when it fills up, every other
+    point is dropped and the recording stride doubles, so memory stays
+    bounded while the whole run remains plottable.
+    """
+
+    COLUMNS = ("n", "mae", "rmse", "window_mae", "window_rmse")
+
+    def __init__(self, capacity: int = 512, window: int = 50):
         self.n = 0
         self.sum_abs = 0.0
         self.sum_sq = 0.0
 
-        self.history_n = []
-        self.history_mae = []
-        self.history_rmse = []
+        self.capacity = capacity
+        self.window = window
+        self.stride = 1
+        self._hist = np.zeros((capacity, len(self.COLUMNS)))
+        self._hist_len = 0
+        self._recent = np.zeros(window)
+        self._recent_count = 0
 
     def update(self, pred, y):
         error = pred - y
@@ -29,12 +74,30 @@ class Metrics:
         self.sum_sq += error * error
         self.n += 1
 
-        mae_now = self.mae
-        rmse_now = self.rmse
+        self._recent[self._recent_count % self.window] = error
+        self._recent_count += 1
 
-        self.history_n.append(self.n)
-        self.history_mae.append(mae_now)
-        self.history_rmse.append(rmse_now)
+        if self.n % self.stride == 0:
+            self._record()
+
+    def _record(self) -> None:
+        if self._hist_len == self.capacity:
+            kept = self._hist[1::2]  # keep points at multiples of the doubled stride
+            self._hist[:len(kept)] = kept
+            self._hist_len = len(kept)
+            self.stride *= 2
+            if self.n % self.stride:
+                return
+        self._hist[self._hist_len] = (self.n, self.mae, self.rmse, self.window_mae, self.window_rmse)
+        self._hist_len += 1
+
+    def recent_errors(self) -> np.ndarray:
+        """Signed errors in the window, oldest first."""
+        k = min(self._recent_count, self.window)
+        if self._recent_count <= self.window:
+            return self._recent[:k].copy()
+        pos = self._recent_count % self.window
+        return np.concatenate([self._recent[pos:], self._recent[:pos]])
 
     @property
     def mae(self):
@@ -44,10 +107,67 @@ class Metrics:
     def rmse(self):
         return math.sqrt(self.sum_sq / self.n) if self.n > 0 else None
 
+    @property
+    def window_mae(self):
+        k = min(self._recent_count, self.window)
+        return float(np.abs(self._recent[:k]).mean()) if k else None
+
+    @property
+    def window_rmse(self):
+        k = min(self._recent_count, self.window)
+        return math.sqrt(float(np.square(self._recent[:k]).mean())) if k else None
+
+    # -------------
+    # History export (used by plot.plot_metrics)
+    # -------------
+    def history(self) -> dict:
+        h = self._hist[:self._hist_len]
+        return {name: h[:, i].copy() for i, name in enumerate(self.COLUMNS)}
+
+    @property
+    def history_n(self):
+        return self._hist[:self._hist_len, 0].astype(int)
+
+    @property
+    def history_mae(self):
+        return self._hist[:self._hist_len, 1].copy()
+
+    @property
+    def history_rmse(self):
+        return self._hist[:self._hist_len, 2].copy()
+
+    def restore(self, history: np.ndarray, recent: np.ndarray, stride: int) -> None:
+        """Reload a saved history table and window (see checkpoint.py)."""
+        history = history[-self.capacity:]
+        self._hist[:len(history)] = history
+        self._hist_len = len(history)
+        self.stride = stride
+        recent = recent[-self.window:]
+        self._recent[:len(recent)] = recent
+        self._recent_count = len(recent)
+
+    def __setstate__(self, state):
+        # Upgrade Metrics pickled with unbounded history lists
+        if "_hist" in state:
+            self.__dict__.update(state)
+            return
+        self.__init__()
+        self.n = state.get("n", 0)
+        self.sum_abs = state.get("sum_abs", 0.0)
+        self.sum_sq = state.get("sum_sq", 0.0)
+        rows = list(zip(state.get("history_n", []), state.get("history_mae", []), state.get("history_rmse", [])))
+        if rows:
+            step = max(1, -(-len(rows) // self.capacity))
+            table = np.array([(n, m, r, np.nan, np.nan) for n, m, r in rows[step - 1::step]])
+            self.restore(table, np.zeros(0), step)
+
     def __repr__(self):
         if self.n == 0:
             return "MAE=None, RMSE=None, n=0"
-        return f"MAE={self.mae:.3f}, RMSE={self.rmse:.3f}, n={self.n}"
+        # The window is empty after upgrading a legacy pickle (no recent errors kept)
+        w_mae, w_rmse = self.window_mae, self.window_rmse
+        window = "n/a" if w_mae is None else f"{w_mae:.3f}, RMSE={w_rmse:.3f}"
+        return f"MAE={self.mae:.3f}, RMSE={self.rmse:.3f}, window MAE={window}, n={self.n}"
 
 
 # -------------------------------------
@@ -55,35 +175,101 @@ class Metrics:
 # -------------------------------------
 @dataclass
 class Learner:
-    vectorizer: HashingVectorizer
-    model: SGDRegressor
+    vectorizer: "HashingVectorizer"
+    model: "SGDRegressor"
     fitted: bool = False
     num_samples: int = 0
-    metrics: Metrics = Metrics()
+    metrics: Metrics = field(default_factory=Metrics)
+
+    batch_size: int = 1          # ratings per online mini-batch
+    replay_size: int = 0         # past samples replayed into each mini-batch
+    replay_capacity: int = 512   # bound on the replay buffer
 
     TEXT_SCALE: float = 3.0   # boosts text signal
     NORM_LLM: float = 100.0   # llm score scaled to [0,1]
 
+    def _buffers(self) -> None:
+        # Created lazily so learners pickled before buffers existed still load
+        if not hasattr(self, "_pending"):
+            self._pending = []
+            self._replay = deque(maxlen=self.replay_capacity)
+            self._rng = np.random.default_rng(SEED)
+
+    @property
+    def pending(self) -> int:
+        self._buffers()
+        return len(self._pending)
+
     # -------------
     # Feature builder
     # -------------
-    def features(self, menu_text: str, llm_score: int) -> np.ndarray:
-        X_text = self.vectorizer.transform([menu_text]).toarray()
-        X_text *= self.TEXT_SCALE
+    def features(self, menu_text: str, llm_score: int, tokens: DishTokens = None) -> sp.csr_matrix:
+        """tokens: per-dish token tuples of the same menu (menu_text.menu_dish_tokens)."""
+        if tokens is not None and self._fast_hashing():
+            return self.features_from_dishes([tokens], [llm_score])
+        return self.features_many([menu_text], [llm_score])
+
+    def features_many(self, menus: List[str], llm_scores: List[int]) -> sp.csr_matrix:
+        """Sparse (CSR) hashed text features plus the scaled LLM column."""
+        if not self._fast_hashing():
+            X_text = self.vectorizer.transform(menus)
+            X_text *= self.TEXT_SCALE
+            return self._with_llm(X_text, llm_scores)
+        n = self.vectorizer.n_features
+        return self.features_from_indices([token_indices(text_tokens(m), n) for m in menus], llm_scores)
+
+    def features_from_dishes(self, menus_tokens: Sequence[DishTokens], llm_scores: List[int]) -> sp.csr_matrix:
+        """
+        Features from per-dish token tuples. Tokens and hashes are cached
+        per dish, and dishes recur across days even when whole menus don't.
+        """
+        n = self.vectorizer.n_features
+        empty = np.zeros(0, dtype=np.int32)
+        return self.features_from_indices(
+            [np.concatenate([token_indices(t, n) for t in dishes]) if dishes else empty
+             for dishes in menus_tokens],
+            llm_scores)
+
+    def features_from_indices(self, index_lists: Sequence[np.ndarray], llm_scores: List[int]) -> sp.csr_matrix:
+        """Features from hashed column indices, skipping tokenization entirely."""
+        rows, n = len(index_lists), self.vectorizer.n_features
+        lens = np.fromiter((len(ix) for ix in index_lists), dtype=np.int64, count=rows)
+        row_ids = np.arange(rows, dtype=np.int64)
+        # Sort (row, column) keys once, with the LLM score as column n of every
+        # row; unique's counts turn repeated tokens into counts, as in HashingVectorizer
+        cols = np.concatenate([*index_lists, np.full(rows, n, dtype=np.int64)])
+        keys, counts = np.unique(np.concatenate([np.repeat(row_ids, lens), row_ids]) * (n + 1) + cols,
+                                 return_counts=True)
+        row, col = np.divmod(keys, n + 1)
+        data = counts * self.TEXT_SCALE
+        llm = col == n
+        data[llm] = np.asarray(llm_scores, dtype=float)[row[llm]] / self.NORM_LLM
+        indptr = np.zeros(rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row, minlength=rows), out=indptr[1:])
+        return sp.csr_matrix((data, col, indptr), shape=(rows, n + 1))
 
-        llm_scaled = llm_score / self.NORM_LLM
-        X = np.hstack([X_text, np.array([[llm_scaled]], dtype=float)])
-        return X
+    def _with_llm(self, X_text: sp.csr_matrix, llm_scores: List[int]) -> sp.csr_matrix:
+        """Append the scaled LLM column by splicing it into the CSR arrays (no hstack)."""
+        rows, n = X_text.shape
+        ends = X_text.indptr[1:]
+        llm_scaled = np.asarray(llm_scores, dtype=float) / self.NORM_LLM
+        return sp.csr_matrix((np.insert(X_text.data, ends, llm_scaled),
+                              np.insert(X_text.indices, ends, n),
+                              X_text.indptr + np.arange(rows + 1)), shape=(rows, n + 1))
+
+    def _fast_hashing(self) -> bool:
+        """True when token_index reproduces self.vectorizer exactly."""
+        v = self.vectorizer
+        return (v.analyzer == "word" and v.ngram_range == (1, 1) and v.lowercase
+                and v.token_pattern == r"(?u)\b\w\w+\b" and v.stop_words is None
+                and v.preprocessor is None and v.tokenizer is None and v.strip_accents is None
+                and not v.alternate_sign and v.norm is None and not v.binary)
 
     # -------------------------------
     # Initial batch training
     # -------------------------------
     def initial_fit(self, menus: List[str], llm_scores: List[int], user_scores: List[float]) -> None:
-        X_text = self.vectorizer.transform(menus).toarray()
-        X_text *= self.TEXT_SCALE
-
-        llm_scaled = np.array(llm_scores, dtype=float) / self.NORM_LLM
-        X = np.hstack([X_text, llm_scaled.reshape(-1, 1)])
+        X = self.features_many(menus, llm_scores)
 
         y = np.array(user_scores, dtype=float)
         self.model.partial_fit(X, y)
@@ -93,32 +279,66 @@ class Learner:
     # -------------------------------
     # Online update
     # -------------------------------
-    def update(self, menu_text: str, llm_score: int, user_score: float) -> None:
-        X = self.features(menu_text, llm_score)
-        y = np.array([user_score], dtype=float)
-        self.model.partial_fit(X, y)
+    def update(self, menu_text: str, llm_score: int, user_score: float, tokens: DishTokens = None) -> bool:
+        """
+        Queue one rating (features are built once here) and train when
+        batch_size ratings are pending. Returns True if a step was taken.
+        """
+        with span("update", size=len(menu_text)) as s:
+            self._buffers()
+            X = self.features(menu_text, llm_score, tokens)
+            self._pending.append((X, float(llm_score), float(user_score)))
+            if len(self._pending) < self.batch_size:
+                s["trained"] = False
+                return False
+            self.flush()
+            s["trained"] = True
+            return True
+
+    def flush(self) -> None:
+        """Train on all pending ratings, mixed with replayed past samples."""
+        self._buffers()
+        if not self._pending:
+            return
+
+        rows = [x for x, _, _ in self._pending]
+        llm = np.array([s for _, s, _ in self._pending], dtype=float)
+        y = np.array([t for _, _, t in self._pending], dtype=float)
+        X = sp.vstack(rows, format="csr")
+
+        X_fit, y_fit = X, y
+        if self.replay_size > 0 and self._replay:
+            k = min(self.replay_size, len(self._replay))
+            idx = self._rng.choice(len(self._replay), size=k, replace=False)
+            X_fit = sp.vstack([X] + [self._replay[i][0] for i in idx], format="csr")
+            y_fit = np.concatenate([y, [self._replay[i][1] for i in idx]])
+
+        self.model.partial_fit(X_fit, y_fit)
         self.fitted = True
+        self.num_samples += len(y)
 
-        self.num_samples += 1
+        # Hybrid prediction after update, reusing the same features
+        preds = self._blend(self.model.predict(X), llm)
+        for pred, target in zip(preds, y):
+            self.metrics.update(float(pred), float(target))
 
-        # Hybrid prediction after update
-        pred = self.hybrid_predict(menu_text, llm_score)
-        self.metrics.update(pred, user_score)
+        self._replay.extend(zip(rows, y))
+        self._pending.clear()
 
     # -------------------------------
     # Raw regression prediction
     # -------------------------------
-    def predict_raw(self, menu_text: str, llm_score: int) -> float:
+    def predict_raw(self, menu_text: str, llm_score: int, tokens: DishTokens = None) -> float:
         if not self.fitted:
             return None
-        X = self.features(menu_text, llm_score)
+        X = self.features(menu_text, llm_score, tokens)
         return float(self.model.predict(X)[0])
 
     # -------------------------------
     # Hybrid α-weighted scoring
     # -------------------------------
-    def hybrid_predict(self, menu_text: str, llm_score: int) -> float:
-        raw_pred = self.predict_raw(menu_text, llm_score)
+    def hybrid_predict(self, menu_text: str, llm_score: int, tokens: DishTokens = None) -> float:
+        raw_pred = self.predict_raw(menu_text, llm_score, tokens)
         if raw_pred is None:
             return float(llm_score)  # cold start
 
@@ -131,16 +351,46 @@ class Learner:
     # -------------------------------
     # Public predict method
     # -------------------------------
-    def predict(self, menu_text: str, llm_score: int) -> float:
-        return self.hybrid_predict(menu_text, llm_score)
+    def predict(self, menu_text: str, llm_score: int, tokens: DishTokens = None) -> float:
+        with span("predict", size=len(menu_text)):
+            return self.hybrid_predict(menu_text, llm_score, tokens)
+
+    # -------------------------------
+    # Vectorized batch prediction
+    # -------------------------------
+    def predict_many(self, menus: List[str], llm_scores: List[int]) -> np.ndarray:
+        """Hybrid predictions for many menus with one feature build and one predict."""
+        llm = np.asarray(llm_scores, dtype=float)
+        if not self.fitted or len(menus) == 0:
+            return llm.copy()  # cold start
+
+        raw = self.model.predict(self.features_many(menus, llm_scores))
+        return self._blend(raw, llm)
+
+    def _blend(self, raw: np.ndarray, llm: np.ndarray) -> np.ndarray:
+        alpha = min(self.num_samples / 50, 1.0)
+        return np.clip(alpha * raw + (1 - alpha) * llm, 1.0, 5.0)
+
+    def rank(self, menus: List[str], llm_scores: List[int]) -> List[tuple]:
+        """(index, prediction) pairs, best menu first."""
+        preds = self.predict_many(menus, llm_scores)
+        order = np.argsort(-preds, kind="stable")
+        return [(int(i), float(preds[i])) for i in order]
 
 
 # -------------------------------------
 # Build learner with tuned HashingVectorizer / SGD
 # -------------------------------------
-def build_learner() -> Learner:
+def build_learner(n_features: int = N_FEATURES, batch_size: int = 1, replay_size: int = 0) -> Learner:
+    """
+    n_features is the hash width; features stay sparse, so 2**18+ is cheap.
+    batch_size / replay_size configure mini-batch online updates.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDRegressor
+
     vect = HashingVectorizer(
-        n_features=1024,
+        n_features=n_features,
         alternate_sign=False,
         norm=None
     )
@@ -150,4 +400,41 @@ def build_learner() -> Learner:
         eta0=0.02,
         random_state=SEED
     )
-    return Learner(vectorizer=vect, model=sgd)
+    return Learner(vectorizer=vect, model=sgd, batch_size=batch_size, replay_size=replay_size)
+
+
+# -------------------------------------
+# Warm start from the interaction log
+# -------------------------------------
+def train_from_log(learner: Learner, log, epochs: int = 1, chunk_size: int = 1024,
+                   shuffle: bool = True, profile: dict = None, seed: int = SEED) -> int:
+    """
+    Stream an InteractionLog through the learner chunk by chunk
+    (initial_fit on the first chunk, partial_fit after), for `epochs`
+    shuffled passes. Memory is bounded by chunk_size. Returns the number
+    of distinct rows trained on; num_samples also counts each row once,
+    so repeated epochs don't inflate the hybrid α.
+    Rows logged without an LLM score (NaN, from an LLM fallback) are skipped.
+    """
+    rng = np.random.default_rng(seed)
+    rows = 0
+    for epoch in range(epochs):
+        for chunk in log.iter_chunks(chunk_size, shuffle=shuffle, rng=rng, profile=profile):
+            keep = np.isfinite(chunk["llm_score"])
+            if not keep.all():
+                idx = np.flatnonzero(keep)
+                if len(idx) == 0:
+                    continue
+                chunk = {"menu": [chunk["menu"][i] for i in idx.tolist()],
+                         "llm_score": chunk["llm_score"][idx], "user_score": chunk["user_score"][idx]}
+            n = len(chunk["menu"])
+            if epoch == 0:
+                rows += n
+            if not learner.fitted:
+                learner.initial_fit(chunk["menu"], chunk["llm_score"], chunk["user_score"])
+                continue
+            X = learner.features_many(chunk["menu"], chunk["llm_score"])
+            learner.model.partial_fit(X, np.asarray(chunk["user_score"], dtype=float))
+            if epoch == 0:
+                learner.num_samples += n
+    return rows
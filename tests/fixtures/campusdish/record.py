@@ -0,0 +1,49 @@
+# tests/fixtures/campusdish/record.py
+"""
+Refresh these fixtures from the live site (needs network):
+
+    python tests/fixtures/campusdish/record.py 2026-11-02
+
+Writes location.html, menu_default.json (no periodId) and one
+menu_<PeriodId>.json per meal period, the layout test_http_backend.py serves.
+"""
+import json
+import os
+import re
+import sys
+import urllib.parse
+import urllib.request
+from datetime import date
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(HERE))))
+
+from menu_backends import BASE_URL, LOCATION_PATH, MENU_API  # noqa: E402
+
+
+def _get(path: str, params=None) -> bytes:
+    url = BASE_URL + path + ("?" + urllib.parse.urlencode(params) if params else "")
+    req = urllib.request.Request(url, headers={"User-Agent": "MenuMind/1.0", "Accept": "application/json"})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return resp.read()
+
+
+def record(target: date) -> None:
+    html = _get(LOCATION_PATH)
+    with open(os.path.join(HERE, "location.html"), "wb") as f:
+        f.write(html)
+    location_id = re.search(rb'locationId["\']?\s*[:=]\s*["\']?(\d+)', html, re.IGNORECASE).group(1).decode()
+
+    params = {"locationId": location_id, "mode": "Daily", "date": target.strftime("%m/%d/%Y"), "periodId": ""}
+    default = json.loads(_get(MENU_API, params))
+    with open(os.path.join(HERE, "menu_default.json"), "w", encoding="utf-8") as f:
+        json.dump(default, f, indent=2)
+    for period in default["Menu"].get("MenuPeriods", []):
+        data = json.loads(_get(MENU_API, dict(params, periodId=str(period["PeriodId"]))))
+        with open(os.path.join(HERE, f"menu_{period['PeriodId']}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+    print(f"Recorded location {location_id} for {target.isoformat()} into {HERE}")
+
+
+if __name__ == "__main__":
+    record(date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else date.today())
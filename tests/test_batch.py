@@ -0,0 +1,48 @@
+# tests/test_batch.py
+"""batch.ingest on ratings with bad rows: they are skipped, the rest is checkpointed."""
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+pytest.importorskip("sklearn")
+
+import batch  # noqa: E402
+import main  # noqa: E402
+from checkpoint import load_checkpoint  # noqa: E402
+from interaction_log import InteractionLog  # noqa: E402
+
+PROFILE = {"is_vegetarian": False, "favorite_food": ["beef"]}
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "LOG_PATH", str(tmp_path / "interactions"))
+    monkeypatch.setattr(main, "MODEL_PATH", str(tmp_path / "learner.npz"))
+    monkeypatch.setattr(main, "LEGACY_MODEL_PATH", str(tmp_path / "learner.pkl"))
+    return tmp_path
+
+
+def test_bad_rows_are_skipped(paths):
+    ratings = [{"menu": f"roasted beef greens {i}", "llm_score": 4, "user_score": 5} for i in range(4)]
+    ratings[1:1] = [
+        {"menu": "tofu rice", "llm_score": 3},                      # no user_score
+        {"menu": "tofu rice", "llm_score": 3, "user_score": "n/a"},
+        {"menu": "tofu rice", "llm_score": "x", "user_score": 2},
+        {"llm_score": 3, "user_score": 2},                          # no menu
+        {"menu": "tofu rice", "llm_score": 3, "user_score": 9},     # out of range
+    ]
+    assert batch.ingest(iter(ratings), PROFILE) == 4
+    with InteractionLog(str(paths / "interactions")) as log:
+        assert len(log) == 4
+    assert load_checkpoint(str(paths / "learner.npz")).num_samples == 4
+
+
+def test_checkpoint_is_saved_when_input_fails(paths):
+    def ratings():
+        for i in range(4):
+            yield {"menu": f"roasted beef greens {i}", "llm_score": 4, "user_score": 5}
+        raise ValueError("bad JSON line")
+
+    with pytest.raises(ValueError):
+        batch.ingest(ratings(), PROFILE)
+    assert load_checkpoint(str(paths / "learner.npz")).num_samples == 4
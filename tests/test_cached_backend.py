@@ -0,0 +1,68 @@
+# tests/test_cached_backend.py
+"""CachedBackend in front of a stub backend: what is cached and what is retried."""
+from datetime import date
+
+import pytest
+
+from menu_backends import CachedBackend, MenuBackend
+from menu_cache import MenuCache
+
+DAY = date(2030, 3, 4)
+DINNER = {"Hearth": [{"name": "BBQ Brisket", "icons": []}], "True Balance": []}
+
+
+class StubBackend(MenuBackend):
+    name = "stub"
+
+    def __init__(self, menu):
+        self.menu = menu
+        self.calls = 0
+
+    def fetch(self, target_date, meal, stations=None, detailed=False):
+        self.calls += 1
+        return {st: list(dishes) for st, dishes in self.menu.items()}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = MenuCache(str(tmp_path / "menu_cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_empty_station_is_cached(cache):
+    inner = StubBackend(DINNER)
+    backend = CachedBackend(inner, cache)
+    for _ in range(3):
+        assert backend.fetch(DAY, "Dinner") == {"Hearth": ["BBQ Brisket"], "True Balance": []}
+    assert inner.calls == 1
+
+
+def test_station_that_failed_to_load_is_retried(cache):
+    inner = StubBackend({"Hearth": DINNER["Hearth"]})  # True Balance missing
+    backend = CachedBackend(inner, cache)
+    assert backend.fetch(DAY, "Dinner") == {"Hearth": ["BBQ Brisket"]}
+    backend.fetch(DAY, "Dinner")
+    assert inner.calls == 2
+
+    inner.menu = DINNER
+    backend.fetch(DAY, "Dinner")
+    backend.fetch(DAY, "Dinner")
+    assert inner.calls == 3
+
+
+def test_all_empty_menu_is_not_cached(cache):
+    inner = StubBackend({"Hearth": [], "True Balance": []})
+    backend = CachedBackend(inner, cache)
+    backend.fetch(DAY, "Dinner")
+    backend.fetch(DAY, "Dinner")
+    assert inner.calls == 2
+
+
+def test_fetch_range_caches_empty_stations(cache):
+    inner = StubBackend(DINNER)
+    backend = CachedBackend(inner, cache)
+    first = backend.fetch_range(DAY, DAY, ["Dinner"], detailed=True)
+    assert first == {(DAY, "Dinner"): DINNER}
+    assert backend.fetch_range(DAY, DAY, ["Dinner"], detailed=True) == first
+    assert inner.calls == 1
@@ -0,0 +1,67 @@
+# tests/test_checkpoint.py
+"""save_checkpoint -> load_checkpoint must give a learner that behaves identically."""
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+pytest.importorskip("sklearn")
+
+from checkpoint import CheckpointWriter, load_checkpoint, read_header, save_checkpoint  # noqa: E402
+from simulate_menu import iter_synthetic  # noqa: E402
+from supervised_model import build_learner  # noqa: E402
+
+PROFILE = {"is_vegetarian": True, "favorite_food": ["tofu"]}
+
+
+def _data(n, seed):
+    menus, llm, user = next(iter_synthetic(n, PROFILE, seed=seed))
+    return menus, llm.tolist(), user.astype(float).tolist()
+
+
+@pytest.fixture
+def trained():
+    learner = build_learner(n_features=2 ** 12)
+    menus, llm, user = _data(80, seed=1)
+    learner.initial_fit(menus[:60], llm[:60], user[:60])
+    for m, s, u in zip(menus[60:], llm[60:], user[60:]):
+        learner.update(m, s, u)
+    return learner
+
+
+def test_roundtrip_predict_and_partial_fit(trained, tmp_path):
+    path = str(tmp_path / "learner.npz")
+    save_checkpoint(trained, path)
+    loaded = load_checkpoint(path)
+
+    assert loaded.fitted and loaded.num_samples == trained.num_samples == 80
+    assert repr(loaded.metrics) == repr(trained.metrics)
+    menus, llm, user = _data(40, seed=2)
+    np.testing.assert_array_equal(loaded.predict_many(menus, llm), trained.predict_many(menus, llm))
+
+    # Further training must continue exactly where the in-memory learner is
+    X = trained.features_many(menus[:20], llm[:20])
+    for learner in (trained, loaded):
+        learner.model.partial_fit(X, np.array(user[:20]))
+        for m, s, u in zip(menus[20:], llm[20:], user[20:]):
+            learner.update(m, s, u)
+    np.testing.assert_array_equal(loaded.model.coef_, trained.model.coef_)
+    np.testing.assert_array_equal(loaded.model.intercept_, trained.model.intercept_)
+    assert loaded.model.t_ == trained.model.t_
+    np.testing.assert_array_equal(loaded.predict_many(menus, llm), trained.predict_many(menus, llm))
+
+
+def test_unfitted_roundtrip(tmp_path):
+    path = str(tmp_path / "learner.npz")
+    save_checkpoint(build_learner(batch_size=4, replay_size=8), path)
+    loaded = load_checkpoint(path)
+    assert not loaded.fitted and loaded.batch_size == 4 and loaded.replay_size == 8
+    assert read_header(path)["num_samples"] == 0
+
+
+def test_writer_flush_writes_latest(trained, tmp_path):
+    path = str(tmp_path / "learner.npz")
+    writer = CheckpointWriter(path, min_interval=60.0)
+    writer.save(build_learner())
+    writer.save(trained)
+    writer.close()
+    assert read_header(path)["num_samples"] == 80
@@ -0,0 +1,96 @@
+# tests/test_http_backend.py
+"""HttpBackend against CampusDish fixture responses served from localhost."""
+import os
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip("urllib3")
+
+from menu_backends import LOCATION_PATH, MENU_API, HttpBackend  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "campusdish")
+DAY = date(2030, 3, 4)
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        type(self).requests.append((url.path, query))
+        if url.path == LOCATION_PATH:
+            name, ctype = "location.html", "text/html"
+        elif url.path == MENU_API:
+            name, ctype = f"menu_{query.get('periodId') or 'default'}.json", "application/json"
+        else:
+            name = None
+        path = os.path.join(FIXTURES, name) if name else None
+        if path is None or not os.path.exists(path):
+            self.send_error(404)
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def backend():
+    _FixtureHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    b = HttpBackend(base_url=f"http://127.0.0.1:{server.server_address[1]}")
+    yield b
+    b.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_location_id_is_read_from_page_once(backend):
+    assert backend._location() == "695"
+    assert backend._location() == "695"
+    assert [p for p, _ in _FixtureHandler.requests] == [LOCATION_PATH]
+
+
+def test_fetch_lunch_by_station(backend):
+    menu = backend.fetch(DAY, "Lunch")
+    assert menu == {
+        "Hearth": ["Roasted Chicken Thighs", "Herb Roasted Potatoes"],
+        "True Balance": ["Tofu Stir Fry", "Steamed Broccoli"],
+    }
+    api_calls = [q for p, q in _FixtureHandler.requests if p == MENU_API]
+    assert [q["periodId"] for q in api_calls] == ["", "1421"]
+    assert api_calls[0]["date"] == "03/04/2030" and api_calls[0]["mode"] == "Daily"
+    assert api_calls[0]["locationId"] == "695"
+
+
+def test_fetch_dinner_matches_padded_period_name(backend):
+    assert backend.fetch(DAY, " dinner ", stations=None) == {
+        "Hearth": ["BBQ Brisket"], "True Balance": ["Lentil Curry"], "Copper Hood": [],
+    }
+
+
+def test_detailed_includes_dietary_icons(backend):
+    menu = backend.fetch(DAY, "Lunch", stations=["True Balance"], detailed=True)
+    assert menu["True Balance"][0] == {"name": "Tofu Stir Fry", "icons": ["Vegan", "Plant Based"]}
+
+
+def test_unknown_meal_returns_none(backend):
+    assert backend.fetch(DAY, "Brunch") is None
+
+
+def test_server_error_returns_none(backend):
+    backend.base_url += "/missing"
+    assert backend.fetch(DAY, "Lunch") is None
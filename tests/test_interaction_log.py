@@ -0,0 +1,58 @@
+# tests/test_interaction_log.py
+"""InteractionLog round trip and recovery from a crash mid-append."""
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from interaction_log import RECORD_DTYPE, InteractionLog  # noqa: E402
+
+MENUS = ["roasted chicken thighs", "tofu stir fry rice", "beef pho"]
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "interactions")
+    with InteractionLog(path) as log:
+        for i, menu in enumerate(MENUS):
+            log.append(menu, 3 + i % 2, 1 + i, prediction=2.5)
+    return path
+
+
+def _check_reopened(path, expect):
+    with InteractionLog(path) as log:
+        assert len(log) == len(expect)
+        assert log.read()["menu"] == expect
+        log.append("steamed broccoli", 4, 5)
+    with InteractionLog(path) as log:
+        cols = log.read()
+    assert cols["menu"] == expect + ["steamed broccoli"]
+    assert cols["user_score"].tolist() == [1.0 + i for i in range(len(expect))] + [5.0]
+    assert os.path.getsize(path + ".bin") == (len(expect) + 1) * RECORD_DTYPE.itemsize
+
+
+def test_roundtrip(path):
+    with InteractionLog(path) as log:
+        cols = log.read()
+    assert cols["menu"] == MENUS
+    assert cols["llm_score"].tolist() == [3.0, 4.0, 3.0]
+    assert np.all(cols["prediction"] == 2.5)
+
+
+def test_torn_record_is_dropped(path):
+    size = os.path.getsize(path + ".bin")
+    os.truncate(path + ".bin", size - RECORD_DTYPE.itemsize // 2)
+    _check_reopened(path, MENUS[:2])
+
+
+def test_record_without_its_text_is_dropped(path):
+    size = os.path.getsize(path + ".menus.txt")
+    os.truncate(path + ".menus.txt", size - 3)  # last menu only partly on disk
+    _check_reopened(path, MENUS[:2])
+
+
+def test_text_without_its_record_is_dropped(path):
+    with open(path + ".menus.txt", "ab") as f:
+        f.write(b"half written menu")
+    _check_reopened(path, MENUS)
@@ -0,0 +1,201 @@
+# tests/test_llm.py
+"""Circuit breaker and fallbacks in llm.py, with a stub standing in for ollama."""
+import asyncio
+import copy
+import pickle
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+import llm
+from cache import DiskCache
+from llm import FALLBACK, CircuitBreaker, LLMScore
+
+PROFILE = {"is_vegetarian": True, "favorite_food": ["tofu"]}
+REPLY = '{"score": 5, "rationale": "Tofu is a favorite."}'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class StubOllama:
+    """ollama's Client / AsyncClient: fails menus containing 'bad' (or all, when down)."""
+
+    def __init__(self):
+        self.down = False
+        self.calls = 0
+
+    def _reply(self, messages):
+        self.calls += 1
+        if self.down or "bad" in messages[-1]["content"].lower():
+            raise ConnectionError("ollama unreachable")
+        return REPLY
+
+    def module(self):
+        stub = self
+
+        class Client:
+            def __init__(self, timeout=None):
+                pass
+
+            def chat(self, model, messages, stream=False, **_):
+                reply = stub._reply(messages)
+                if stream:
+                    return iter({"message": {"content": reply[i:i + 4]}} for i in range(0, len(reply), 4))
+                return {"message": {"content": reply}}
+
+        class AsyncClient:
+            async def chat(self, model, messages, **_):
+                return {"message": {"content": stub._reply(messages)}}
+
+        return types.SimpleNamespace(Client=Client, AsyncClient=AsyncClient)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm, "time", types.SimpleNamespace(monotonic=clock.monotonic,
+                                                           perf_counter=time.perf_counter))
+    return clock
+
+
+@pytest.fixture
+def ollama(monkeypatch, tmp_path, clock):
+    stub = StubOllama()
+    monkeypatch.setitem(sys.modules, "ollama", stub.module())
+    monkeypatch.setattr(llm, "_clients", {})
+    monkeypatch.setattr(llm, "_score_cache", DiskCache(str(tmp_path / "llm_cache.sqlite")))
+    monkeypatch.setattr(llm, "breaker", CircuitBreaker(failures=2, cooldown=60.0))
+    return stub
+
+
+def estimate(menu_text):
+    return 4.4
+
+
+# -----------------------------
+# CircuitBreaker
+# -----------------------------
+def test_breaker_opens_after_failures(clock):
+    b = CircuitBreaker(failures=3, cooldown=60.0)
+    for _ in range(2):
+        b.failure()
+    assert b.state == "closed" and b.allow()
+    b.failure()
+    assert b.state == "open" and not b.allow()
+    clock.now += 59
+    assert not b.allow()
+
+
+def test_breaker_half_open_trial(clock):
+    b = CircuitBreaker(failures=1, cooldown=60.0)
+    b.failure()
+    clock.now += 60
+    assert b.state == "half-open"
+    assert b.allow() and not b.allow()  # a single trial call at a time
+    b.failure()  # the trial failed: open again for a full cooldown
+    assert b.state == "open"
+    clock.now += 60
+    assert b.allow()
+    b.success()
+    assert b.state == "closed" and b.allow() and b.allow()
+
+
+def test_breaker_release_ends_trial(clock):
+    b = CircuitBreaker(failures=1, cooldown=60.0)
+    b.failure()
+    clock.now += 60
+    assert b.allow()
+    b.release()
+    assert b.state == "half-open" and b.allow()
+
+
+# -----------------------------
+# llama_score fallbacks
+# -----------------------------
+@pytest.mark.parametrize("structured", [False, True])
+def test_llama_score_success_is_cached(ollama, structured):
+    res = llm.llama_score("tofu stir fry", PROFILE, structured=structured)
+    assert res == (5, "Tofu is a favorite.") and res.source == "llm" and not res.fallback
+    assert llm.llama_score("tofu stir fry", PROFILE, structured=structured) == res
+    assert ollama.calls == 1
+
+
+def test_llama_score_falls_back_then_opens(ollama, clock):
+    ollama.down = True
+    first = llm.llama_score("tofu stir fry", PROFILE, fallback=estimate)
+    assert first == (4, "Model-only estimate (LLM unavailable).")
+    assert first.fallback and first.source == "model"
+
+    assert llm.llama_score("tofu stir fry", PROFILE) is FALLBACK  # no estimate: neutral default
+    assert FALLBACK.fallback and FALLBACK.source == "default"
+    assert llm.breaker.state == "open"
+
+    calls = ollama.calls
+    skipped = llm.llama_score("tofu stir fry", PROFILE, fallback=estimate)
+    assert ollama.calls == calls  # open breaker: the LLM isn't called
+    assert skipped.source == "model" and "circuit open" in skipped[1]
+
+    ollama.down = False
+    clock.now += 60
+    assert llm.llama_score("tofu stir fry", PROFILE).source == "llm"  # half-open trial succeeds
+    assert llm.breaker.state == "closed"
+
+
+def test_unusable_estimate_gives_default(ollama):
+    ollama.down = True
+    assert llm.llama_score("tofu", PROFILE, fallback=lambda m: None) is FALLBACK
+    assert llm.llama_score("tofu", PROFILE, fallback=lambda m: float("nan")) is FALLBACK
+
+
+def test_fallbacks_are_not_cached(ollama):
+    ollama.down = True
+    llm.llama_score("tofu stir fry", PROFILE, fallback=estimate)
+    ollama.down = False
+    assert llm.llama_score("tofu stir fry", PROFILE).source == "llm"
+    assert ollama.calls == 2
+
+
+def test_cancel_is_not_a_failure(ollama):
+    cancel = threading.Event()
+    cancel.set()
+    res = llm.llama_score("tofu stir fry", PROFILE, structured=True, cancel=cancel, fallback=estimate)
+    assert res is FALLBACK
+    assert llm.breaker._count == 0
+
+
+# -----------------------------
+# Batch and dish scoring
+# -----------------------------
+def test_batch_passes_fallback_through(ollama):
+    menus = ["tofu stir fry", "bad menu", "tofu stir fry"]
+    res = llm.llama_score_batch(menus, PROFILE, fallback=estimate)
+    assert [r.source for r in res] == ["llm", "model", "llm"]
+    assert res[1] == (4, "Model-only estimate (LLM unavailable).")
+    assert ollama.calls == 2  # the duplicate menu is sent once
+
+    again = llm.llama_score_batch(menus, PROFILE)
+    assert [r.source for r in again] == ["llm", "default", "llm"]  # only the success was cached
+
+
+def test_dish_fallback_marks_menu_as_model(ollama):
+    scores = asyncio.run(llm.score_dishes_async(["Tofu Stir Fry", "Bad Chili"], PROFILE, fallback=estimate))
+    assert scores["tofu stir fry"].source == "llm" and scores["bad chili"].source == "model"
+
+    res = llm.llama_score_dishes(["Tofu Stir Fry", "Bad Chili"], PROFILE, fallback=estimate)
+    assert res.source == "model"
+    assert llm.llama_score_dishes(["Tofu Stir Fry"], PROFILE).source == "llm"
+
+
+def test_llm_score_pickle_and_copy():
+    res = LLMScore(4, "ok", source="model")
+    for clone in (pickle.loads(pickle.dumps(res)), copy.copy(res), copy.deepcopy(res)):
+        assert clone == res and clone.source == "model" and isinstance(clone, LLMScore)
@@ -0,0 +1,92 @@
+# tests/test_scraper.py
+"""menu_scraper against a static copy of the O-Hill page in headless Chrome."""
+import os
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("selenium")
+
+import menu_scraper  # noqa: E402
+from menu_scraper import DriverPool, menu_scraper as scrape, scrape_range  # noqa: E402
+
+PAGE = os.path.join(os.path.dirname(__file__), "fixtures", "campusdish", "ohill_static.html")
+URL = "file://" + os.path.abspath(PAGE)
+
+TODAY = date.today()
+LUNCH = {
+    "Hearth": ["Roasted Chicken Thighs", "Herb Roasted Potatoes"],
+    "True Balance": ["Tofu Stir Fry", "Steamed Broccoli"],
+}
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = DriverPool(size=1)
+    try:
+        with pool.borrow():
+            pass
+    except Exception as e:
+        pytest.skip(f"headless Chrome unavailable: {e}")
+    yield pool
+    pool.close()
+
+
+def _nomenu(*days):
+    return URL + "?nomenu=" + ",".join(d.isoformat() for d in days)
+
+
+def test_lunch_default_stations(pool):
+    menu = scrape(TODAY + timedelta(days=1), "Lunch", url=URL, pool=pool)
+    assert menu == LUNCH
+
+
+def test_detailed_all_stations(pool):
+    menu = scrape(TODAY + timedelta(days=1), "Lunch", url=URL, pool=pool, stations=None, detailed=True)
+    assert list(menu) == ["Hearth", "True Balance", "Copper Hood"]
+    assert menu["True Balance"][0] == {"name": "Tofu Stir Fry", "icons": ["Vegan", "Plant Based"]}
+    assert menu["Copper Hood"] == [{"name": "Beef Pho", "icons": []}]
+
+
+def test_disabled_date_returns_none(pool):
+    target = TODAY + timedelta(days=2)
+    assert scrape(target, "Lunch", url=_nomenu(target), pool=pool) is None
+
+
+def test_past_date_is_refused_without_a_browser():
+    class NoPool:
+        def borrow(self):
+            raise AssertionError("should not start a browser")
+
+    assert scrape(TODAY - timedelta(days=1), "Lunch", url=URL, pool=NoPool()) is None
+
+
+def test_next_month(pool):
+    target = (TODAY.replace(day=1) + timedelta(days=32)).replace(day=3)
+    assert scrape(target, "Dinner", url=URL, pool=pool) == {"Hearth": ["BBQ Brisket"], "True Balance": []}
+
+
+def test_scrape_range(pool):
+    start, skip, end = (TODAY + timedelta(days=i) for i in (1, 2, 3))
+    menus, errors = scrape_range(start - timedelta(days=2), end, ["Lunch", "Dinner"],
+                                 url=_nomenu(skip), pool=pool)
+    past = start - timedelta(days=2)
+    assert errors[(past, "Lunch")] == "before today (forward-only policy)"
+    assert errors[(skip, "Lunch")] == errors[(skip, "Dinner")] == "date unavailable"
+    assert menus[(skip, "Dinner")] is None
+    for d in (start, end):
+        assert menus[(d, "Lunch")] == LUNCH
+        assert menus[(d, "Dinner")] == {"Hearth": ["BBQ Brisket"], "True Balance": []}
+    assert set(errors) == {(past, "Lunch"), (past, "Dinner"), (skip, "Lunch"), (skip, "Dinner")}
+
+
+def test_single_pass_matches_per_card_lookups(pool):
+    with pool.borrow() as driver:
+        driver.get(URL)
+        menu_scraper._open_change_dialog(driver)
+        assert menu_scraper._select_date_forward_only(driver, TODAY + timedelta(days=1))
+        assert menu_scraper._select_meal(driver, "Lunch")
+        assert menu_scraper._click_done(driver)
+        fast = menu_scraper._scrape_stations(driver, None)
+        slow = menu_scraper._scrape_stations(driver, list(fast), single_pass=False)
+    assert fast == slow
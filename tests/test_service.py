@@ -0,0 +1,171 @@
+# tests/test_service.py
+"""ScoringService end to end with a stub scorer standing in for Ollama."""
+import asyncio
+import json
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+pytest.importorskip("sklearn")
+
+from interaction_log import InteractionLog  # noqa: E402
+from service import HTTPError, ScoringService, make_handler  # noqa: E402
+
+PROFILE = {"is_vegetarian": False, "favorite_food": ["beef"]}
+MENU = "roasted beef greens rice"
+
+
+def stub_score(menu, profile):
+    return 4, "stub"
+
+
+@pytest.fixture
+def make_service(tmp_path):
+    made = []
+
+    def _make(capacity=4):
+        svc = ScoringService(users_dir=str(tmp_path / "users"), capacity=capacity, score_fn=stub_score,
+                             log=InteractionLog(str(tmp_path / "log")), workers=2)
+        made.append(svc)
+        return svc
+
+    yield _make
+    for svc in made:
+        svc.executor.shutdown(wait=True)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_profile_score_feedback(make_service):
+    svc = make_service()
+
+    async def scenario():
+        assert (await svc.set_profile({"user_id": "alice", "profile": PROFILE}))["ok"]
+        first = await svc.score({"user_id": "alice", "menu": MENU})
+        fb = await svc.feedback({"user_id": "alice", "menu": MENU, "llm_score": first["llm_score"],
+                                 "user_score": 5, "prediction": first["prediction"]})
+        second = await svc.score({"user_id": "alice", "menu_dict": {"Hearth": ["Roasted Beef", "Rice"]}})
+        await svc.close()
+        return first, fb, second
+
+    first, fb, second = run(scenario())
+    assert first["llm_score"] == 4 and first["llm_source"] == "llm"
+    assert first["fitted"] is False and first["prediction"] == 4.0  # cold start: LLM score only
+    assert fb["trained"] is True
+    assert second["fitted"] is True and second["menu"] == "roasted beef rice"
+    assert len(svc.log) == 1
+
+
+def test_validation_errors(make_service):
+    svc = make_service()
+
+    async def scenario():
+        with pytest.raises(HTTPError) as unknown:
+            await svc.score({"user_id": "nobody", "menu": MENU})
+        with pytest.raises(HTTPError) as bad_id:
+            await svc.score({"user_id": "../etc", "menu": MENU})
+        await svc.set_profile({"user_id": "bob", "profile": PROFILE})
+        with pytest.raises(HTTPError) as bad_rating:
+            await svc.feedback({"user_id": "bob", "menu": MENU, "llm_score": 3, "user_score": 9})
+        await svc.close()
+        return unknown.value.status, bad_id.value.status, bad_rating.value.status
+
+    assert run(scenario()) == (404, 400, 400)
+
+
+def test_bad_fields_are_rejected_before_training(make_service):
+    svc = make_service()
+
+    async def scenario():
+        await svc.set_profile({"user_id": "erin", "profile": PROFILE})
+        statuses = []
+        for body in ({"llm_score": 3, "user_score": 5, "prediction": "n/a"},
+                     {"llm_score": "three", "user_score": 5},
+                     {"llm_score": 3}):
+            with pytest.raises(HTTPError) as err:
+                await svc.feedback({"user_id": "erin", "menu": MENU, **body})
+            statuses.append(err.value.status)
+        with pytest.raises(HTTPError) as bad_score:
+            await svc.score({"user_id": "erin", "menu": MENU, "llm_score": "n/a"})
+        statuses.append(bad_score.value.status)
+        learner = svc._hot["erin"].learner
+        await svc.close()
+        return statuses, learner
+
+    statuses, learner = run(scenario())
+    assert statuses == [400, 400, 400, 400]
+    assert learner.num_samples == 0 and learner.pending == 0
+    assert len(svc.log) == 0
+
+
+def test_fallback_feedback_is_not_trained(make_service):
+    svc = make_service()
+
+    async def scenario():
+        await svc.set_profile({"user_id": "carol", "profile": PROFILE})
+        fb = await svc.feedback({"user_id": "carol", "menu": MENU, "llm_score": 3, "user_score": 2,
+                                 "llm_source": "default"})
+        recs = svc.log.read()
+        await svc.close()
+        return fb, recs
+
+    fb, recs = run(scenario())
+    assert fb["trained"] is False
+    assert recs["llm_score"][0] != recs["llm_score"][0]  # NaN
+
+
+def test_lru_eviction_checkpoints(make_service, tmp_path):
+    svc = make_service(capacity=1)
+
+    async def scenario():
+        for user in ("a", "b"):
+            await svc.set_profile({"user_id": user, "profile": PROFILE})
+        await svc.feedback({"user_id": "a", "menu": MENU, "llm_score": 4, "user_score": 5})
+        await svc.score({"user_id": "b", "menu": MENU})  # evicts "a"
+        if svc._saving:
+            await asyncio.gather(*svc._saving.values())
+        hot = list(svc._hot)
+        reloaded = await svc.score({"user_id": "a", "menu": MENU})  # evicts "b", reloads "a"
+        await svc.close()
+        return hot, reloaded
+
+    hot, reloaded = run(scenario())
+    assert hot == ["b"]
+    assert os.path.exists(tmp_path / "users" / "a" / "learner.npz")
+    assert not os.path.exists(tmp_path / "users" / "b" / "learner.npz")  # never dirty
+    assert reloaded["fitted"] is True
+
+
+def test_http_roundtrip(make_service):
+    svc = make_service()
+
+    async def request(port, path, payload):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        body = json.dumps(payload).encode()
+        writer.write(f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                     "Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+        raw = await reader.read()
+        writer.close()
+        head, _, data = raw.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(data)
+
+    async def scenario():
+        server = await asyncio.start_server(make_handler(svc), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            results = [
+                await request(port, "/profile", {"user_id": "dave", "profile": PROFILE}),
+                await request(port, "/score", {"user_id": "dave", "menu": MENU}),
+                await request(port, "/nope", {}),
+            ]
+        await svc.close()
+        return results
+
+    (s1, _), (s2, scored), (s3, _) = run(scenario())
+    assert (s1, s2, s3) == (200, 200, 404)
+    assert scored["llm_score"] == 4
@@ -0,0 +1,91 @@
+# tests/test_supervised_model.py
+"""Learner features and Metrics."""
+import pickle
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+pytest.importorskip("sklearn")
+
+import numpy as np  # noqa: E402
+import scipy.sparse as sp  # noqa: E402
+
+from menu_text import dish_tokens, menu_dish_tokens, process_menu_dict  # noqa: E402
+from supervised_model import Metrics, build_learner, token_indices  # noqa: E402
+
+MENU_DICT = {
+    "Hearth": ["Roasted Chicken Thighs", "Herb Roasted Potatoes", "BBQ Brisket"],
+    "True Balance": ["Tofu Stir Fry with Rice", "Steamed Broccoli", "Tofu & Greens"],
+}
+
+
+def _reference(learner, menus, llm_scores):
+    """What the features were before the fast paths: vectorizer output plus an hstacked LLM column."""
+    X_text = learner.vectorizer.transform(menus) * learner.TEXT_SCALE
+    llm = np.asarray(llm_scores, dtype=float).reshape(-1, 1) / learner.NORM_LLM
+    return sp.hstack([X_text, sp.csr_matrix(llm)], format="csr")
+
+
+def _same(a, b):
+    return a.shape == b.shape and abs(a - b).max() == 0
+
+
+def test_text_features_match_vectorizer():
+    learner = build_learner()
+    menus = ["roasted beef beef greens", "Tofu, tofu & RICE!", "", "a b c", process_menu_dict(MENU_DICT)]
+    scores = [1, 2, 3, 4, 5]
+    assert _same(learner.features_many(menus, scores), _reference(learner, menus, scores))
+    assert _same(learner.features(menus[0], 4), _reference(learner, menus[:1], [4]))
+
+
+def test_dish_token_features_match_vectorizer():
+    learner = build_learner()
+    menu = process_menu_dict(MENU_DICT)
+    tokens = menu_dish_tokens(MENU_DICT)
+    assert _same(learner.features(menu, 3, tokens), _reference(learner, [menu], [3]))
+    assert _same(learner.features_from_dishes([tokens, []], [3, 5]), _reference(learner, [menu, ""], [3, 5]))
+
+
+def test_known_dish_hits_the_token_caches():
+    learner = build_learner()
+    n = learner.vectorizer.n_features
+    learner.features("tofu stir fry", 3, menu_dish_tokens({"True Balance": ["Tofu Stir Fry"]}))
+    tok_hits, idx_hits = dish_tokens.cache_info().hits, token_indices.cache_info().hits
+    tokens = menu_dish_tokens({"Hearth": ["Tofu Stir Fry"]})  # same dish, another day and station
+    X = learner.features("tofu stir fry", 3, tokens)
+    assert dish_tokens.cache_info().hits == tok_hits + 1
+    assert token_indices.cache_info().hits == idx_hits + 1
+    assert token_indices(tokens[0], n) is token_indices(("tofu", "stir", "fry"), n)
+    assert _same(X, _reference(learner, ["tofu stir fry"], [3]))
+
+
+def _legacy_metrics(n=5):
+    """A Metrics as pickled before the bounded history (plain lists, no window)."""
+    m = Metrics()
+    m.__dict__ = {
+        "n": n, "sum_abs": 0.5 * n, "sum_sq": 0.25 * n,
+        "history_n": list(range(1, n + 1)), "history_mae": [0.5] * n, "history_rmse": [0.5] * n,
+    }
+    return pickle.loads(pickle.dumps(m))
+
+
+def test_legacy_metrics_upgrade():
+    m = _legacy_metrics()
+    assert m.n == 5 and m.mae == 0.5 and m.window_mae is None
+    assert repr(m) == "MAE=0.500, RMSE=0.500, window MAE=n/a, n=5"
+    assert list(m.history_n) == [1, 2, 3, 4, 5]
+
+    m.update(4.0, 3.0)
+    assert "window MAE=1.000, RMSE=1.000" in repr(m)
+
+
+def test_legacy_metrics_checkpoint_roundtrip(tmp_path):
+    from checkpoint import load_checkpoint, save_checkpoint
+    from supervised_model import build_learner
+
+    learner = build_learner()
+    learner.metrics = _legacy_metrics()
+    path = str(tmp_path / "learner.npz")
+    save_checkpoint(learner, path)
+    assert repr(load_checkpoint(path).metrics) == "MAE=0.500, RMSE=0.500, window MAE=n/a, n=5"
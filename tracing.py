@@ -0,0 +1,152 @@
+# tracing.py
+"""
+Lightweight per-stage timing. Enable by setting MENUMIND_TRACE to a file
+path (or calling enable()); every span then appends one JSON line:
+
+    {"ts": ..., "stage": "llm", "ms": 812.4, "cache_hit": false, "size": 96}
+
+Disabled spans are a shared no-op object, so instrumentation is nearly free.
+
+    python tracing.py summary [trace.jsonl]    # p50 / p95 per stage
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+DEFAULT_TRACE_PATH = "data/trace.jsonl"
+
+_lock = threading.Lock()
+_file = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setitem__(self, key, value):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+class _Span(dict):
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: str, attrs: dict):
+        super().__init__(attrs)
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.t0) * 1000
+        record = {"ts": time.time(), "stage": self.stage, "ms": round(ms, 3)}
+        record.update(self)
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        _write(record)
+        return False
+
+
+def enable(path: str = DEFAULT_TRACE_PATH) -> None:
+    global _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        _file = open(path, "a", encoding="utf-8", buffering=1)  # line-buffered
+
+
+def disable() -> None:
+    global _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+        _file = None
+
+
+def enabled() -> bool:
+    return _file is not None
+
+
+def span(stage: str, **attrs):
+    """`with span("llm", model=m) as s: ...; s["cache_hit"] = True`"""
+    if _file is None:
+        return _NULL
+    return _Span(stage, attrs)
+
+
+def _write(record: dict) -> None:
+    line = json.dumps(record, default=str)
+    with _lock:
+        if _file is not None:
+            _file.write(line + "\n")
+
+
+if os.environ.get("MENUMIND_TRACE"):
+    enable(os.environ["MENUMIND_TRACE"])
+
+
+# -------------------------------------
+# Summary
+# -------------------------------------
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    if len(sorted_vals) == 1:
+        return sorted_vals[0]
+    pos = (len(sorted_vals) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (pos - lo)
+
+
+def summarize(path: str = DEFAULT_TRACE_PATH) -> Dict[str, dict]:
+    durations: Dict[str, List[float]] = defaultdict(list)
+    hits: Dict[str, int] = defaultdict(int)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            durations[rec["stage"]].append(rec["ms"])
+            if rec.get("cache_hit"):
+                hits[rec["stage"]] += 1
+    out = {}
+    for stage, vals in durations.items():
+        vals.sort()
+        out[stage] = {
+            "n": len(vals),
+            "p50_ms": _percentile(vals, 0.50),
+            "p95_ms": _percentile(vals, 0.95),
+            "total_ms": sum(vals),
+            "cache_hits": hits[stage],
+        }
+    return out
+
+
+def print_summary(path: str = DEFAULT_TRACE_PATH) -> None:
+    stats = summarize(path)
+    print(f"{'stage':<16} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'total ms':>12} {'hits':>6}")
+    for stage, s in sorted(stats.items(), key=lambda kv: -kv[1]["total_ms"]):
+        print(f"{stage:<16} {s['n']:>6} {s['p50_ms']:>10.2f} {s['p95_ms']:>10.2f} "
+              f"{s['total_ms']:>12.1f} {s['cache_hits']:>6}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "summary":
+        print_summary(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_TRACE_PATH)
+    else:
+        print("usage: python tracing.py summary [trace.jsonl]")